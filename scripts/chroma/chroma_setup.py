@@ -8,7 +8,10 @@ def setup():
     client = chromadb.PersistentClient(path=cfg["root"])
 
     # Creates a collection for storing the embeddings
-    collection = client.get_or_create_collection(name=cfg["dbname"])
+    # Cosine space, so ChromaStore scores are cosine similarities
+    collection = client.get_or_create_collection(
+        name=cfg["dbname"], metadata={"hnsw:space": "cosine"}
+    )
 
     print("ChromaDB initialized successfully.")
     return collection
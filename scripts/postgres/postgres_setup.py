@@ -1,6 +1,9 @@
 import psycopg
 from utils.config import config
 from psycopg import OperationalError
+from app.main.keyword_search import FTS_DOCUMENT
+from app.main.company_index import TABLES as COMPANY_TABLES
+from app.main.chunk_summaries import TABLES as SUMMARY_TABLES
 
 
 class PostgreSQLsetup:
@@ -111,6 +114,28 @@ class PostgreSQLsetup:
             else:
                 print("Table 'articles' already exists.")
 
+            # Full-text index for lexical (keyword) retrieval
+            cur.execute(
+                f"""
+                CREATE INDEX IF NOT EXISTS articles_fts_idx
+                ON articles USING GIN ({FTS_DOCUMENT});
+            """
+            )
+            conn.commit()
+            print("Full-text index on 'articles' is in place.")
+
+            # Company gazetteer and company -> article postings
+            for statement in COMPANY_TABLES:
+                cur.execute(statement)
+            conn.commit()
+            print("Company index tables are in place.")
+
+            # Ingest-time chunk summaries of long articles
+            for statement in SUMMARY_TABLES:
+                cur.execute(statement)
+            conn.commit()
+            print("Chunk summary tables are in place.")
+
             cur.close()
             conn.close()
         except Exception as e:
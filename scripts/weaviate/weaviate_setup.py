@@ -1,38 +1,32 @@
 import logging
 import weaviate
-import weaviate.classes as wvc
 from utils.config import config
+from app.main.weaviate_collections import (
+    create_versioned_collection,
+    point_alias,
+    prune_versions,
+)
+
+"""
+Initializes an empty Weaviate store behind the configured alias. Other collections are left untouched; to change the schema or re-vectorize without downtime, run the blue/green rebuild instead:
+
+    python -m app.main.weaviate_rebuild [--background]
+"""
 
 cfg = config.get_section("weaviate")
 client = weaviate.connect_to_local(port=cfg["port"])
 
 try:
-    # Delete all schemas (which deletes all data)
-    client.collections.delete_all()
-    print("Weaviate database erased successfully.")
-
-    try:
-        # Create new Weaviate database
-        schema = [
-            wvc.config.Property(
-                name=field["name"],
-                data_type=wvc.config.DataType(field["dataType"]),
-                skip_vectorization=field["skip"],
-            )
-            for field in cfg["schema"]
-        ]
+    # Create a new empty version and point the alias at it
+    name = create_versioned_collection(client, cfg)
+    point_alias(client, cfg["dbname"], name)
+    print(f"Alias {cfg['dbname']} now points to {name}")
 
-        client.collections.create(
-            name=cfg["dbname"],
-            vectorizer_config=wvc.config.Configure.Vectorizer.text2vec_contextionary(),
-            properties=schema,
-        )
-        print(f"Created schema for {cfg['dbname']}")
+    # Previous versions are kept for rollback up to the configured limit
+    prune_versions(client, cfg, keep=cfg["rebuild"]["keep_versions"])
 
-    except Exception as e:
-        logging.error(f"Error creating database: {e}")
 except Exception as e:
-    logging.error(f"Error deleting database: {e}")
+    logging.error(f"Error creating database: {e}")
 
 finally:
     client.close()
@@ -4,6 +4,8 @@ import asyncio
 from utils.config import config
 from .smart_scraper import ScraperAI
 from utils.helpers import store_to_postgres
+from app.main.company_index import CompanyIndex
+from app.main.chunk_summaries import ChunkSummaries
 from app.main.weaviate_embeddings import GenerateEmbeddings
 
 import json
@@ -51,5 +53,11 @@ if __name__ == "__main__":
             embeddings = GenerateEmbeddings(db_conn=conn)
             embeddings.check_postgres()
 
+            # Update the company -> article postings
+            CompanyIndex(db_conn=conn).run()
+
+            # Precompute chunk summaries of long articles (if chunk_summaries.at_ingest)
+            ChunkSummaries(db_conn=conn).ingest()
+
     finally:
         conn.close()
@@ -6,6 +6,7 @@ from google import genai
 from mistralai import Mistral
 from .crawler import CrawlLinks
 from utils.config import ConfigLoader
+from utils.llm_metrics import llm_metrics
 from utils.helpers import generate_hash, check_hash
 
 
@@ -136,41 +137,13 @@ class ScraperAI:
             # 2) Wait for LLM rate slot, then call LLM with exponential backoff
             retry_delay = 1
             for attempt in range(1, self.retries + 1):
-                await self.llm_limiter.wait_for_slot()
-                logging.debug(f"LLM call: attempt {attempt}")
-
                 # Construct query and pass to LLM
                 try:
-                    if self.LLM == "gemini":
-                        query = self.prompt + markdown
-                        # No native async call for Gemini so must run in a thread
-                        response = await asyncio.to_thread(
-                            self.client.models.generate_content,
-                            model=self.model,
-                            contents=query,
-                            config={"response_mime_type": "application/json"},
-                        )
-                        json_response = response.text
-
-                    elif self.LLM == "mistral":
-                        try:
-                            query = [
-                                {"role": "system", "content": f"{self.prompt}"},
-                                {"role": "user", "content": f"{markdown}"},
-                            ]
-                            # Native method for Mistral's async call
-                            response = await asyncio.wait_for(
-                                self.client.chat.complete_async(
-                                    model=self.model,
-                                    messages=query,
-                                    response_format={"type": "json_object"},
-                                ),
-                                timeout=45,
-                            )
-                        except asyncio.TimeoutError:
-                            logging.error("LLM request timed out. Retrying...")
-                            continue
-                        json_response = response.choices[0].message.content
+                    try:
+                        json_response = await self.request_llm(markdown, attempt)
+                    except asyncio.TimeoutError:
+                        logging.error("LLM request timed out. Retrying...")
+                        continue
 
                     # Attempt to parse the JSON response
                     try:
@@ -205,6 +178,44 @@ class ScraperAI:
             logging.error(f"Failed LLM call after after retries for: {url}")
             return None
 
+    async def request_llm(self, markdown, attempt=1):
+        """
+        Waits for an LLM rate slot, then asks the LLM to extract the article from the markdown. Returns the JSON text of the response.
+        """
+        with llm_metrics.call("ScraperAI", self.LLM, self.model) as call:
+            await self.llm_limiter.wait_for_slot()
+            call.send()
+            logging.debug(f"LLM call: attempt {attempt}")
+
+            if self.LLM == "gemini":
+                query = self.prompt + markdown
+                # No native async call for Gemini so must run in a thread
+                response = await asyncio.to_thread(
+                    self.client.models.generate_content,
+                    model=self.model,
+                    contents=query,
+                    config={"response_mime_type": "application/json"},
+                )
+                call.gemini(response)
+                return response.text
+
+            elif self.LLM == "mistral":
+                query = [
+                    {"role": "system", "content": f"{self.prompt}"},
+                    {"role": "user", "content": f"{markdown}"},
+                ]
+                # Native method for Mistral's async call
+                response = await asyncio.wait_for(
+                    self.client.chat.complete_async(
+                        model=self.model,
+                        messages=query,
+                        response_format={"type": "json_object"},
+                    ),
+                    timeout=45,
+                )
+                call.openai(response)
+                return response.choices[0].message.content
+
     async def process_scraping(self, session, links_w_hashes):
         """Processes scrapes for all links asynchronously."""
         tasks = [
@@ -0,0 +1,157 @@
+import logging
+import psycopg
+from utils.config import config, ConfigLoader
+from app.main.local_LLM import LocalLLM, run_coroutine
+
+"""
+Query-independent chunk summaries, computed at ingest.
+
+Articles too long for a single LLM call are chunked and each chunk is summarized once, without a query, and stored in PostgreSQL keyed by (article hash, chunk index, model). Run it as a background job after ingest (python -m app.main.chunk_summaries), or inline in the ingest pipelines with chunk_summaries.at_ingest. At query time LocalLLM reduces these stored summaries instead of re-summarizing every chunk, so a long-article answer takes one LLM call instead of N+1.
+"""
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS chunk_summaries (
+        hash TEXT NOT NULL,
+        chunk INTEGER NOT NULL,
+        model TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        PRIMARY KEY (hash, model, chunk)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chunk_summary_state (
+        model TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    );
+    """,
+]
+
+
+class ChunkSummaries:
+    """
+    Stores and looks up per-chunk article summaries. The LLM is only needed to build them (run), so lookups stay cheap.
+    """
+
+    def __init__(self, db_conn=None, llm=None):
+        self.cfg = config.get_section("chunk_summaries")
+        self.db_conn = db_conn or psycopg.connect(**config.get_section("DB_USER"))
+        self.db_conn.autocommit = True
+        self.llm = llm
+        # Summaries are stored under the model that writes them; run() uses
+        # only this one (no routing), so every chunk of an article matches
+        self.model = ConfigLoader("llmConfig").get_section("models")[self.cfg["model"]]
+
+    def create_tables(self):
+        with self.db_conn.cursor() as cur:
+            for statement in TABLES:
+                cur.execute(statement)
+
+    def get(self, article_hash, model=None):
+        """
+        Chunk summaries of an article in chunk order (by default those of the configured model), or None if there are none.
+        """
+        model = model or self.model
+        with self.db_conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT summary FROM chunk_summaries
+                WHERE hash = %s AND model = %s ORDER BY chunk
+                """,
+                (article_hash, model),
+            )
+            rows = cur.fetchall()
+        return [row[0] for row in rows] or None
+
+    def summarize(self, content):
+        """
+        Summarizes each chunk of an article. Returns [] if the article fits in one call, so it never needs chunking.
+        """
+        size = self.llm.chunk_size(None)
+        if self.llm.tokens(content) <= size:
+            return []
+        chunks = self.llm.chunk_text(content, size)
+        return run_coroutine(self.llm.map_chunks(None, chunks))
+
+    def write(self, article_hash, summaries):
+        with self.db_conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO chunk_summaries (hash, chunk, model, summary)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (hash, model, chunk)
+                DO UPDATE SET summary = EXCLUDED.summary
+                """,
+                [
+                    (article_hash, i, self.model, summary)
+                    for i, summary in enumerate(summaries)
+                ],
+            )
+
+    def last_summarized_id(self):
+        with self.db_conn.cursor() as cur:
+            cur.execute(
+                "SELECT last_id FROM chunk_summary_state WHERE model = %s",
+                (self.model,),
+            )
+            row = cur.fetchone()
+        return row[0] if row else 0
+
+    def set_last_summarized_id(self, last_id):
+        with self.db_conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO chunk_summary_state (model, last_id) VALUES (%s, %s)
+                ON CONFLICT (model) DO UPDATE SET last_id = EXCLUDED.last_id
+                """,
+                (self.model, last_id),
+            )
+
+    def run(self):
+        """
+        Ingest stage: summarizes the chunks of every long article added since the last run. Stops at the first LLM failure so that article is retried next time.
+        """
+        if not self.cfg["enabled"]:
+            return
+        if self.llm is None:
+            self.llm = LocalLLM(self.cfg["model"], routing=False)
+        self.create_tables()
+
+        last_id, count = self.last_summarized_id(), 0
+        with self.db_conn.cursor(name="chunk_summaries", withhold=True) as read:
+            read.itersize = self.cfg["batch_size"]
+            read.execute(
+                "SELECT id, hash, content FROM articles WHERE id > %s ORDER BY id",
+                (last_id,),
+            )
+            for article_id, article_hash, content in read:
+                summaries = self.summarize(content or "")
+                if any(s.startswith("LLM Error:") for s in summaries):
+                    logging.error(f"Chunk summaries failed for article {article_id}.")
+                    break
+                if summaries:
+                    self.write(article_hash, summaries)
+                    count += 1
+                last_id = article_id
+                self.set_last_summarized_id(last_id)
+
+        logging.info(f"Stored chunk summaries for {count} long articles.")
+
+    def ingest(self):
+        """
+        Ingest pipeline step: runs the summaries inline only if chunk_summaries.at_ingest is set. By default they are left to the standalone job (python -m app.main.chunk_summaries), which picks up where the last run stopped, so storing articles isn't held up by an LLM call per chunk.
+        """
+        if self.cfg["at_ingest"]:
+            self.run()
+
+    def close(self):
+        self.db_conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    summaries = ChunkSummaries()
+    try:
+        summaries.run()
+    finally:
+        summaries.close()
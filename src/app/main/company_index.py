@@ -0,0 +1,299 @@
+import os
+import logging
+import psycopg
+from collections import Counter, deque
+from utils.config import config
+
+"""
+Company -> article inverted index, built at ingest.
+
+A gazetteer of known companies (seeded from the Arango Companies collection and from the companies searched with Tavily) is compiled into an Aho-Corasick automaton. Each new article is scanned once and the matches are stored in PostgreSQL as postings (company, article hash, mentions), so retrieval can restrict a vector search to a company's articles.
+"""
+
+TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS companies (
+        key TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        source TEXT,
+        indexed BOOLEAN DEFAULT FALSE
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS company_postings (
+        company TEXT REFERENCES companies(key) ON DELETE CASCADE,
+        hash TEXT NOT NULL,
+        mentions INTEGER NOT NULL,
+        PRIMARY KEY (company, hash)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS company_postings_hash_idx ON company_postings (hash);",
+    """
+    CREATE TABLE IF NOT EXISTS company_index_state (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    );
+    """,
+]
+
+
+def company_key(name):
+    """Same key scheme as the Arango Companies collection."""
+    return " ".join(name.lower().split()).replace(" ", "_")
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over lowercase patterns. Finds every occurrence of every pattern in one pass over the text, however many patterns there are.
+    """
+
+    def __init__(self, patterns):
+        # patterns: {pattern text: value}
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for pattern, value in patterns.items():
+            state = 0
+            for char in pattern.lower():
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append((len(pattern), value))
+
+        # Breadth-first pass to set failure links
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def search(self, text):
+        """Yields (start, end, value) for every match in the (lowercased) text."""
+        state = 0
+        for i, char in enumerate(text.lower()):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, value in self.output[state]:
+                yield i - length + 1, i + 1, value
+
+
+class CompanyIndex:
+    """
+    Maintains the company gazetteer and the company -> article postings in PostgreSQL.
+    """
+
+    def __init__(self, db_conn=None):
+        self.cfg = config.get_section("companies")
+        self.db_conn = db_conn or psycopg.connect(**config.get_section("DB_USER"))
+        self.db_conn.autocommit = True
+
+    def create_tables(self):
+        with self.db_conn.cursor() as cur:
+            for statement in TABLES:
+                cur.execute(statement)
+
+    def add_companies(self, names, source=None):
+        """
+        Adds companies to the gazetteer. New entries are backfilled against existing articles on the next run().
+        """
+        rows = [
+            (company_key(name), name.strip(), source)
+            for name in names
+            if name and len(name.strip()) >= self.cfg["min_length"]
+        ]
+        with self.db_conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO companies (key, name, source) VALUES (%s, %s, %s)
+                ON CONFLICT (key) DO NOTHING
+                """,
+                rows,
+            )
+        return [row[0] for row in rows]
+
+    def seed_from_arango(self):
+        """Adds every company in the Arango Companies collection."""
+        from arango import ArangoClient
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        cfg = config.get_section("arango")
+        db = ArangoClient(hosts=f"http://localhost:{cfg['port']}").db(
+            cfg["dbname"], username=cfg["user"], password=os.getenv("ARANGO_PWD")
+        )
+        names = list(db.aql.execute("FOR c IN Companies RETURN c.name"))
+        self.add_companies(names, source="arango")
+        logging.info(f"Seeded gazetteer with {len(names)} Arango companies.")
+
+    def gazetteer(self, pending_only=False):
+        query = "SELECT key, name FROM companies"
+        if pending_only:
+            query += " WHERE indexed IS FALSE"
+        with self.db_conn.cursor() as cur:
+            cur.execute(query)
+            return dict(cur.fetchall())
+
+    @staticmethod
+    def build_matcher(gazetteer):
+        return AhoCorasick({name.lower(): key for key, name in gazetteer.items()})
+
+    @staticmethod
+    def scan(matcher, text):
+        """Counts company mentions, keeping only whole-word matches."""
+        text = text or ""
+        mentions = Counter()
+        for start, end, key in matcher.search(text):
+            before = text[start - 1] if start > 0 else " "
+            after = text[end] if end < len(text) else " "
+            if not before.isalnum() and not after.isalnum():
+                mentions[key] += 1
+        return mentions
+
+    def index_articles(self, matcher, min_id=0, max_id=None):
+        """
+        Scans articles with min_id < id (<= max_id) through a server-side cursor and writes their postings in batches. Returns the highest id scanned.
+        """
+        query = "SELECT id, hash, title, content FROM articles WHERE id > %s"
+        params = [min_id]
+        if max_id is not None:
+            query += " AND id <= %s"
+            params.append(max_id)
+        query += " ORDER BY id"
+
+        last_id, postings, written = min_id, [], 0
+        with self.db_conn.cursor(name="company_index", withhold=True) as read:
+            read.itersize = self.cfg["batch_size"]
+            read.execute(query, params)
+            for article_id, article_hash, title, content in read:
+                mentions = self.scan(matcher, f"{title or ''}\n{content or ''}")
+                postings.extend(
+                    (key, article_hash, count) for key, count in mentions.items()
+                )
+                last_id = article_id
+                if len(postings) >= self.cfg["batch_size"]:
+                    written += self.write_postings(postings)
+                    postings = []
+        written += self.write_postings(postings)
+
+        logging.info(f"Wrote {written} company postings.")
+        return last_id
+
+    def write_postings(self, postings):
+        if postings:
+            with self.db_conn.cursor() as cur:
+                cur.executemany(
+                    """
+                    INSERT INTO company_postings (company, hash, mentions)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (company, hash)
+                    DO UPDATE SET mentions = EXCLUDED.mentions
+                    """,
+                    postings,
+                )
+        return len(postings)
+
+    def last_indexed_id(self):
+        with self.db_conn.cursor() as cur:
+            cur.execute(
+                "SELECT last_id FROM company_index_state WHERE name = 'articles'"
+            )
+            row = cur.fetchone()
+        return row[0] if row else 0
+
+    def set_last_indexed_id(self, last_id):
+        with self.db_conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO company_index_state (name, last_id) VALUES ('articles', %s)
+                ON CONFLICT (name) DO UPDATE SET last_id = EXCLUDED.last_id
+                """,
+                (last_id,),
+            )
+
+    def run(self):
+        """
+        Ingest stage:
+        1. Seed the gazetteer from Arango (if enabled).
+        2. Backfill companies added since the last run against all articles.
+        3. Scan new articles against the full gazetteer.
+        """
+        self.create_tables()
+        if self.cfg["seed_from_arango"]:
+            try:
+                self.seed_from_arango()
+            except Exception as e:
+                logging.error(f"Could not seed companies from Arango: {e}")
+
+        last_id = self.last_indexed_id()
+        pending = self.gazetteer(pending_only=True)
+        if pending and last_id:
+            logging.info(f"Backfilling {len(pending)} new companies.")
+            self.index_articles(self.build_matcher(pending), max_id=last_id)
+
+        gazetteer = self.gazetteer()
+        if gazetteer:
+            last_id = self.index_articles(self.build_matcher(gazetteer), last_id)
+            self.set_last_indexed_id(last_id)
+
+        with self.db_conn.cursor() as cur:
+            cur.execute(
+                "UPDATE companies SET indexed = TRUE WHERE key = ANY(%s)",
+                (list(pending),),
+            )
+
+    def articles(self, company):
+        """
+        Hashes of the articles mentioning a company, most mentions first. None if the company is not in the gazetteer.
+        """
+        key = company_key(company)
+        with self.db_conn.cursor() as cur:
+            cur.execute("SELECT 1 FROM companies WHERE key = %s", (key,))
+            if cur.fetchone() is None:
+                return None
+            cur.execute(
+                """
+                SELECT hash FROM company_postings WHERE company = %s
+                ORDER BY mentions DESC LIMIT %s
+                """,
+                (key, self.cfg["max_postings"]),
+            )
+            return [row[0] for row in cur.fetchall()]
+
+    def close(self):
+        self.db_conn.close()
+
+
+def add_to_gazetteer(names, source=None):
+    """
+    Adds companies to the gazetteer from outside the ingest pipeline (e.g. a Tavily search). Failures are logged rather than raised.
+    """
+    index = None
+    try:
+        index = CompanyIndex()
+        index.create_tables()
+        return index.add_companies(names, source=source)
+    except Exception as e:
+        logging.error(f"Could not add {names} to the company gazetteer: {e}")
+        return []
+    finally:
+        if index is not None:
+            index.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    index = CompanyIndex()
+    try:
+        index.run()
+    finally:
+        index.close()
@@ -0,0 +1,111 @@
+import re
+import numpy as np
+from utils.tokens import token_counter
+from app.main.vector_store import bm25_scores, build_lexicon
+
+
+def cosine(a, b):
+    if a is None or b is None:
+        return 0.0
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    denom = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / denom) if denom else 0.0
+
+
+def mmr(hits, n, lambda_=0.7):
+    """
+    Maximal marginal relevance: greedily picks n hits, trading relevance (the first-stage score) against similarity to the hits already picked. A hit without a vector can't be compared, so it is charged the highest redundancy of any candidate in that round; it is never preferred over an equally relevant hit just for lacking one.
+    """
+    if not hits:
+        return []
+    scores = np.array([hit.score for hit in hits], dtype=np.float32)
+    # Rescale so relevance and cosine similarity share a 0-1 range
+    span = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / span if span else np.ones_like(scores)
+
+    selected, remaining = [], list(range(len(hits)))
+    while remaining and len(selected) < n:
+        picked = [j for j in selected if hits[j].vector is not None]
+        redundancy = {
+            i: max(
+                (cosine(hits[i].vector, hits[j].vector) for j in picked), default=0.0
+            )
+            for i in remaining
+            if hits[i].vector is not None
+        }
+        unknown = max(redundancy.values(), default=0.0)
+
+        best, best_score = None, None
+        for i in remaining:
+            penalty = redundancy.get(i, unknown)
+            score = lambda_ * relevance[i] - (1 - lambda_) * penalty
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+        remaining.remove(best)
+    return [hits[i] for i in selected]
+
+
+def split_passages(text, passage_tokens=200):
+    """Groups consecutive sentences into passages of roughly passage_tokens."""
+    sentences = re.split(r"(?<=[.!?])\s+|\n+", text or "")
+    sentences = [s.strip() for s in sentences if s.strip()]
+    passages, current, size = [], [], 0
+    for sentence, tokens in zip(sentences, token_counter.count_many(sentences)):
+        if current and size + tokens > passage_tokens:
+            passages.append(" ".join(current))
+            current, size = [], 0
+        current.append(sentence)
+        size += tokens
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def pack_context(query, hits, budget, passage_tokens=200):
+    """
+    Fills a token budget with the best passages from the given hits. Each document first contributes its best passage (in hit order), then the remaining budget goes to the highest BM25-scoring passages overall. Passages are emitted per document, in their original order, under a short source header.
+    """
+    passages = {}
+    for d, hit in enumerate(hits):
+        content = hit.data.get("content")
+        for p, passage in enumerate(split_passages(content, passage_tokens)):
+            passages[(d, p)] = passage
+    if not passages:
+        return ""
+
+    scores = bm25_scores(query, build_lexicon(passages))
+    ranked = sorted(passages, key=lambda key: (-scores.get(key, 0.0), key))
+
+    # Best passage of every document first, then the rest by score
+    firsts = {}
+    for key in ranked:
+        firsts.setdefault(key[0], key)
+    leads = set(firsts.values())
+    order = sorted(leads) + [key for key in ranked if key not in leads]
+
+    counts = dict(zip(passages, token_counter.count_many(list(passages.values()))))
+    headers = [header(d, hit) for d, hit in enumerate(hits)]
+    chosen, used = set(), sum(token_counter.count_many(headers))
+    for key in order:
+        tokens = counts[key]
+        if used + tokens > budget:
+            continue
+        chosen.add(key)
+        used += tokens
+
+    sections = []
+    for d, hit in enumerate(hits):
+        keys = sorted(key for key in chosen if key[0] == d)
+        if keys:
+            body = "\n".join(passages[key] for key in keys)
+            sections.append(f"{header(d, hit)}\n{body}")
+    return "\n\n".join(sections)
+
+
+def header(d, hit):
+    """Source line shown above a document's passages, e.g. [1] Title (date) link."""
+    data = hit.data
+    title = data.get("title", "Unknown")
+    published = data.get("published", "Unknown")
+    return f"[{d + 1}] {title} ({published}) {data.get('link', '')}".rstrip()
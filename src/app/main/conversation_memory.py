@@ -0,0 +1,73 @@
+import logging
+from utils.helpers import token_count
+
+
+class ConversationMemory:
+    """
+    Conversation history for multi-turn prompts. Only questions and answers are stored (never the retrieved context). The last max_turns stay verbatim, older turns are folded into a short rolling summary, and what gets replayed into a prompt is capped by a token budget.
+    """
+
+    def __init__(self, max_turns=5, token_budget=1024, summarize=None, count=None):
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summarize = summarize  # (summary, turns) -> updated summary
+        self.count = count or token_count
+        self.turns = []  # [{"query": ..., "response": ...}], oldest first
+        self.summary = ""
+        # Model that answered so far; follow-ups stay on it to reuse its KV cache
+        self.model = None
+        # Whether the last answer failed (possibly part-way through a stream)
+        self.failed = False
+
+    def add(self, query, response):
+        """Records a turn; turns beyond max_turns are folded into the summary."""
+        self.turns.append({"query": query, "response": response})
+        if len(self.turns) > self.max_turns:
+            older = self.turns[: -self.max_turns]
+            self.turns = self.turns[-self.max_turns :]
+            self.fold(older)
+
+    def fold(self, turns):
+        """Merges turns into the rolling summary (dropped if that fails)."""
+        if self.summarize is None:
+            return
+        try:
+            self.summary = self.summarize(self.summary, turns)
+        except Exception as e:
+            logging.warning(f"Could not summarize {len(turns)} older turns: {e}")
+
+    def last_turn(self):
+        return self.turns[-1] if self.turns else None
+
+    def messages(self, budget=None):
+        """
+        Chat messages replaying the conversation: the rolling summary, then as many of the most recent turns as fit in the token budget (in order).
+        """
+        budget = self.token_budget if budget is None else budget
+        head = []
+        if self.summary:
+            content = f"Summary of the earlier conversation:\n{self.summary}"
+            head = [{"role": "system", "content": content}]
+            budget -= self.count(content)
+
+        recent = []
+        for turn in reversed(self.turns):
+            tokens = self.count(turn["query"]) + self.count(turn["response"])
+            if tokens > budget:
+                break
+            budget -= tokens
+            recent[:0] = [
+                {"role": "user", "content": turn["query"]},
+                {"role": "assistant", "content": turn["response"]},
+            ]
+        return head + recent
+
+    def to_dict(self):
+        return {"summary": self.summary, "turns": list(self.turns), "model": self.model}
+
+    def load(self, state):
+        """Restores the summary, turns and model saved by to_dict()."""
+        self.summary = state.get("summary", "")
+        self.turns = list(state.get("turns", []))
+        self.model = state.get("model")
+        return self
@@ -0,0 +1,55 @@
+import logging
+from utils.helpers import import_postgres_data
+from app.main.vector_store import get_store
+from app.main.retrieval_cache import bump_watermark
+
+
+class GenerateEmbeddings:
+    """
+    Loads articles that have not been embedded yet from PostgreSQL into a vector store, then flags them as embedded.
+    """
+
+    def __init__(self, db_conn, database="weaviate", batch_size=100):
+        self.db_conn = db_conn
+        self.batch_size = batch_size
+        self.store = get_store(database)
+
+    def check_postgres(self):
+        """
+        Check for new articles from PostgreSQL and upsert them into the store.
+        """
+        fields = self.store.fields
+        articles = import_postgres_data(
+            db_conn=self.db_conn, data=list(fields), only_new=True
+        )
+
+        try:
+            if articles:
+                # zip() drops the trailing 'embedded' column
+                records = [dict(zip(fields, article)) for article in articles]
+                self.store.upsert(records, batch_size=self.batch_size)
+                self.mark_as_embedded([record["hash"] for record in records])
+                bump_watermark(self.max_embedded_id())
+                logging.info(f"Stored {len(records)} new embeddings.")
+            else:
+                logging.info("No new data to embed.")
+        finally:
+            self.store.close()
+
+    def mark_as_embedded(self, hashes):
+        """Update PostgreSQL table to reflect when entries have been embedded."""
+        cursor = self.db_conn.cursor()
+        cursor.execute(
+            "UPDATE articles SET embedded = TRUE WHERE hash = ANY(%s)", (hashes,)
+        )
+        self.db_conn.commit()
+        cursor.close()
+        logging.info("Embeddings marked in postgreSQL.")
+
+    def max_embedded_id(self):
+        """Highest embedded article id; used as the retrieval cache watermark."""
+        cursor = self.db_conn.cursor()
+        cursor.execute("SELECT MAX(id) FROM articles WHERE embedded IS TRUE")
+        max_id = cursor.fetchone()[0]
+        cursor.close()
+        return max_id
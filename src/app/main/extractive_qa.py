@@ -0,0 +1,159 @@
+import re
+import logging
+import threading
+import numpy as np
+from utils.config import config
+from utils.metrics import metrics
+from utils.budget import BudgetedExecutor
+from utils.onnx_model import OnnxModel
+from app.main.context_packing import split_passages
+from app.main.vector_store import bm25_scores, build_lexicon
+
+
+def softmax(logits):
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class ExtractiveQA:
+    """
+    Fast path for factoid questions ("how much did X raise"): a small extractive QA model exported to ONNX reads the best passages of the retrieved articles on CPU and picks an answer span. The span is only used if the model's confidence clears the threshold; otherwise (or if it overruns its latency budget) the query falls through to the LLM.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or config.get_section("extractive_qa")
+        self.enabled = self.settings["enabled"]
+        self.factoid = re.compile(
+            r"^\s*(?:%s)\b" % "|".join(self.settings["question_starts"]), re.I
+        )
+        self.model = OnnxModel(self.settings, truncation="only_second")
+        self.warming = False
+        self.warm_lock = threading.Lock()
+
+        # One worker per engine slot, so concurrent queries don't queue
+        # behind each other's budget
+        self.executor = BudgetedExecutor(
+            "extractive_qa",
+            config.get_section("server")["engine_workers"],
+            self.settings["budget_ms"],
+            self.settings["queue_ms"],
+        )
+
+    def warm_up(self):
+        """
+        Loads (and if needed downloads) the model ahead of the first query; called at startup. Queries never load it themselves, so loading can't eat their latency budget. A model that fails to load is not retried.
+        """
+        try:
+            self.model.load()
+        except Exception as e:
+            self.model.unavailable = True
+            logging.error(f"Extractive QA model unavailable: {e}")
+        finally:
+            self.warming = False
+
+    def is_factoid(self, query):
+        """Only short lookup questions are worth trying without the LLM."""
+        words = len(query.split())
+        return bool(self.factoid.match(query)) and words <= self.settings["max_words"]
+
+    def passages(self, query, hits):
+        """The passages of the hits that share the most terms with the query."""
+        passages = {}
+        for d, hit in enumerate(hits):
+            content = hit.data.get("content")
+            for p, passage in enumerate(
+                split_passages(content, self.settings["passage_tokens"])
+            ):
+                passages[(d, p)] = passage
+        scores = bm25_scores(query, build_lexicon(passages))
+        ranked = sorted(passages, key=lambda key: (-scores.get(key, 0.0), key))
+        return [(hits[d], passages[(d, p)]) for d, p in ranked]
+
+    def extract(self, query, passages):
+        """
+        Reads every (query, passage) pair in one batched forward pass and returns the most confident span as (score, passage index, answer text). The score is P(start) * P(end) over the passage tokens.
+        """
+        encodings, outputs = self.model.run(query, passages)
+        start_logits, end_logits = outputs[:2]
+
+        best = (0.0, None, "")
+        max_span = self.settings["max_answer_tokens"]
+        for i, encoding in enumerate(encodings):
+            # Only spans inside the passage (not the question or padding)
+            in_passage = np.array(
+                [s == 1 for s in encoding.sequence_ids], dtype=bool
+            )
+            if not in_passage.any():
+                continue
+            starts = softmax(np.where(in_passage, start_logits[i], -np.inf))
+            ends = softmax(np.where(in_passage, end_logits[i], -np.inf))
+
+            # Best end at or after each start, within max_answer_tokens
+            scores = np.triu(np.outer(starts, ends))
+            scores = np.tril(scores, max_span - 1)
+            start, end = np.unravel_index(scores.argmax(), scores.shape)
+            if scores[start, end] > best[0]:
+                text = passages[i][
+                    encoding.offsets[start][0] : encoding.offsets[end][1]
+                ]
+                best = (float(scores[start, end]), i, text.strip())
+        return best
+
+    def answer(self, query, hits):
+        """
+        Returns {"answer", "score", "passage", "source"} for a confident extractive answer, or None to fall through to the LLM. Until the model is loaded every query falls through (and the first one starts loading it in the background).
+        """
+        if not self.enabled or self.model.unavailable or not hits:
+            return None
+        if not self.is_factoid(query):
+            metrics.incr("extractive_qa", outcome="skipped")
+            return None
+        if self.model.session is None:
+            metrics.incr("extractive_qa", outcome="not_loaded")
+            with self.warm_lock:
+                start = not self.warming
+                self.warming = True
+            if start:
+                threading.Thread(target=self.warm_up, daemon=True).start()
+            return None
+
+        candidates = self.passages(query, hits)[: self.settings["passages"]]
+        if not candidates:
+            return None
+        texts = [passage for _, passage in candidates]
+        try:
+            score, i, text = self.executor.run(self.extract, query, texts)
+        except TimeoutError as e:
+            metrics.incr("extractive_qa", outcome=f"{e}_timeout")
+            logging.warning(f"Extractive QA over its {e} limit; using the LLM.")
+            return None
+        except Exception as e:
+            metrics.incr("extractive_qa", outcome="error")
+            logging.error(f"Extractive QA failed; using the LLM: {e}")
+            return None
+
+        if i is None or not text or score < self.settings["threshold"]:
+            metrics.incr("extractive_qa", outcome="low_confidence")
+            return None
+        metrics.incr("extractive_qa", outcome="answered")
+        hit, passage = candidates[i]
+        return {
+            "answer": text,
+            "score": round(score, 3),
+            "passage": passage,
+            "source": {
+                field: hit.data.get(field) for field in ("title", "link", "published")
+            },
+        }
+
+    def format(self, result):
+        """The fast-path answer as response text: the span and where it came from."""
+        return self.settings["template"].format(
+            answer=result["answer"],
+            passage=result["passage"],
+            title=result["source"]["title"] or "Unknown",
+            link=result["source"]["link"] or "",
+        )
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,70 @@
+import logging
+import psycopg
+from utils.config import config
+from app.main.vector_store import Hit, tag_groups
+
+# Must match the expression of the GIN index created in postgres_setup.py
+FTS_DOCUMENT = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, ''))"
+
+
+class PostgresKeywordSearch:
+    """
+    Lexical search over the PostgreSQL articles table using its full-text index, ranked with ts_rank_cd. Filters use the same dict format as the vector stores and are applied in SQL.
+    """
+
+    def __init__(self, fields, db_conn=None):
+        self.fields = list(fields)
+        self.schema = set(config.get_section("schema"))
+        self.db_conn = db_conn or psycopg.connect(**config.get_section("DB_USER"))
+        self.db_conn.autocommit = True
+
+    def where_clause(self, filters):
+        """Translates a filter dict into SQL conditions and parameters."""
+        conditions, params = [], []
+        for key, value in (filters or {}).items():
+            # Column names cannot be parameterized; only allow schema columns
+            if key not in self.schema:
+                logging.warning(f"Ignoring filter on unknown column: {key}")
+                continue
+            if isinstance(value, dict):
+                if value.get("gte") is not None:
+                    conditions.append(f"{key} >= %s")
+                    params.append(value["gte"])
+                if value.get("lte") is not None:
+                    conditions.append(f"{key} <= %s")
+                    params.append(value["lte"])
+            elif key == "tags":
+                for group in tag_groups(value):
+                    conditions.append("tags ILIKE ANY(%s)")
+                    params.append([f"%{tag}%" for tag in group])
+            elif isinstance(value, (list, tuple, set)):
+                conditions.append(f"{key} = ANY(%s)")
+                params.append(list(value))
+            else:
+                conditions.append(f"{key} = %s")
+                params.append(value)
+        return "".join(f" AND {c}" for c in conditions), params
+
+    def query(self, texts, k=1, filters=None):
+        where, params = self.where_clause(filters)
+        sql = f"""
+            SELECT {", ".join(self.fields)}, ts_rank_cd({FTS_DOCUMENT}, q) AS rank
+            FROM articles, websearch_to_tsquery('english', %s) q
+            WHERE {FTS_DOCUMENT} @@ q{where}
+            ORDER BY rank DESC
+            LIMIT %s
+        """
+
+        results = []
+        with self.db_conn.cursor() as cur:
+            for text in texts:
+                cur.execute(sql, [text, *params, k])
+                hits = []
+                for row in cur.fetchall():
+                    data = dict(zip(self.fields, row[:-1]))
+                    hits.append(Hit(id=data["hash"], score=float(row[-1]), data=data))
+                results.append(hits)
+        return results
+
+    def close(self):
+        self.db_conn.close()
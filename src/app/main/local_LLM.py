@@ -1,9 +1,91 @@
+import time
 import ollama
+import asyncio
 import logging
+from contextlib import ExitStack, nullcontext
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from utils.config import ConfigLoader
 from utils.helpers import token_count
+from utils.llm_cache import llm_cache
+from utils.llm_metrics import llm_metrics
+from app.main.model_router import router
+from app.main.conversation_memory import ConversationMemory
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
+# How long to use the configured num_ctx before asking an unreachable Ollama again
+CONTEXT_RETRY_SECONDS = 30
+
+
+def run_coroutine(coro):
+    """
+    Runs a coroutine to completion from sync code. If this thread already runs an event loop (e.g. inside an async FastAPI handler), it runs in a helper thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+class Attempt:
+    """
+    One try of a request on a routed model (see LocalLLM.attempts). Used as a context manager around the transport call: it tracks the call for the router and the LLM metrics, and logs and swallows a failure so the caller moves on to the next model. done() caches a successful response.
+    """
+
+    def __init__(self, name, model, key, cached, use_cache, task, site, memory=None):
+        self.name = name  # key of llmConfig models
+        self.model = model  # Ollama model
+        self.key = key
+        self.cached = cached
+        self.use_cache = use_cache
+        self.task = task
+        self.site = site
+        self.memory = memory  # conversation to pin to the model that answers
+        self.parts = []  # streamed text deltas
+        self.error = None
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        self.stack.enter_context(router.track(self.name, self.task))
+        self.call = self.stack.enter_context(
+            llm_metrics.call(self.site, "ollama", self.model)
+        )
+        return self.call
+
+    def __exit__(self, kind, error, traceback):
+        self.stack.__exit__(kind, error, traceback)
+        # GeneratorExit (a stream closed by its consumer) is not a failure
+        if not isinstance(error, Exception):
+            return False
+        logging.error(f"LLM request to {self.model} failed: {error}")
+        self.error = error
+        return True
+
+    def delta(self, text):
+        """Records a streamed text delta and returns it."""
+        self.call.token()
+        self.parts.append(text)
+        return text
+
+    def done(self, content=None):
+        """
+        The response (default: the streamed deltas), cached unless use_cache is False. An answer pins its conversation to this model.
+        """
+        content = ("".join(self.parts) if content is None else content).strip()
+        if self.use_cache:
+            llm_cache.put(self.key, content, model=self.model)
+        if self.memory is not None:
+            self.memory.model = self.name
+        return content
+
+    def failure(self):
+        """The error to return in place of the response; marks the answer failed."""
+        if self.memory is not None:
+            self.memory.failed = True
+        return f"LLM Error: {str(self.error)}"
+
 
 class LocalLLM:
     """
@@ -11,148 +93,537 @@ class LocalLLM:
     """
 
     def __init__(
-        self, model="llama-instruct", conversation_limit=5, custom_chunking=None
+        self,
+        model="llama-instruct",
+        conversation_limit=5,
+        custom_chunking=None,
+        routing=True,
     ):
         cfg = ConfigLoader("llmConfig")
-        self.llm = cfg.get_section("models")[model]
+        self.model = model
+        # Whether the router may send calls to other models (see routes)
+        self.routing = routing
+        self.models = cfg.get_section("models")
+        self.llm = self.models[model]
         self.prompts = cfg.get_section("prompts")
         self.chunked_summary = cfg.get_value("chunked_summary")
 
         # Option to pass custom chunk options for testing purposes
-        if custom_chunking:
-            self.chunking = custom_chunking
-        else:
-            self.chunking = cfg.get_section("chunking")
+        self.chunking = {**cfg.get_section("chunking"), **(custom_chunking or {})}
+
+        # Context window requested from Ollama and tokens kept free for the answer
+        self.context_window = cfg.get_section("context_window")
+        self.contexts = {}  # model -> context length, resolved from Ollama
+        self.context_retry = {}  # model -> when to ask Ollama again after a failure
 
-        # Limit on how many user+assistant pairs of messages to keep around
+        # Limit on how many user+assistant pairs to keep verbatim
         self.conversation_limit = conversation_limit
+        self.memory_cfg = cfg.get_section("memory")
+        self.memory_prompt = cfg.get_value("memory_summary")
+
+        # Questions and answers only; older turns roll into a summary
+        self.memory = self.new_memory()
+
+    def model_context(self, model=None):
+        """
+        Context length a model (default: this LLM's) runs with: the configured num_ctx, capped by the model's trained context length as reported by Ollama. If Ollama can't be reached, num_ctx is used until it answers again.
+        """
+        model = model or self.llm
+        if model not in self.contexts:
+            num_ctx = self.context_window["num_ctx"]
+            if self.context_retry.get(model, 0.0) > time.monotonic():
+                return num_ctx
+            try:
+                info = ollama.show(model).modelinfo or {}
+            except Exception as e:
+                # Not cached: the real limit is read once Ollama is back
+                logging.warning(f"Could not read context length of {model}: {e}")
+                self.context_retry[model] = time.monotonic() + CONTEXT_RETRY_SECONDS
+                return num_ctx
+            trained = next(
+                (v for k, v in info.items() if k.endswith(".context_length")), None
+            )
+            self.contexts[model] = min(num_ctx, trained) if trained else num_ctx
+        return self.contexts[model]
+
+    def token_limit(self):
+        """Largest prompt, in tokens, sent to the model in a single call."""
+        window = self.model_context() - self.context_window["reserve"]
+        return min(self.chunking["limit"], window)
 
-        # Stores as a list of dicts: [{"role": "...", "content": "..."}]
-        self.conversation_history = []
+    def chunk_size(self, query, prior_msgs=None):
+        """
+        Chunk size in tokens: whatever fits in one call next to the chunk prompt and any prior turns. A configured chunking.size overrides it.
+        """
+        if self.chunking.get("size"):
+            return self.chunking["size"]
+        overhead = self.tokens(self.chunk_prompt(query, "", 0, 1)) + sum(
+            self.tokens(m["content"]) for m in prior_msgs or []
+        )
+        return max(self.token_limit() - overhead, self.chunking["min_size"])
 
-    def chunk_text(self, text):
+    def chunk_text(self, text, size=None):
         """
-        Splits large text into smaller overlapping chunks according to the
-        configured chunk_size and chunk_overlap values.
+        Splits large text into smaller overlapping chunks of at most size tokens (default: chunk_size() without a query) with the configured overlap.
         """
         splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunking["size"], chunk_overlap=self.chunking["overlap"]
+            chunk_size=size or self.chunk_size(None),
+            chunk_overlap=self.chunking["overlap"],
+            length_function=self.tokens,
         )
         return splitter.split_text(text)
 
-    def call_llm(self, messages):
+    def tokens(self, text):
+        """Token count of text under this model's tokenizer."""
+        return token_count(text, self.model)
+
+    def routes(self, task, messages):
         """
-        Sends a list of messages (role + content) to the local LLM and returns its response as a string. Wraps Ollama's API call.
+        Models (keys of llmConfig models) to try for a task, best first: the router's ranking if routing is enabled (globally and for this LLM), otherwise just this LLM's model. Answers in a conversation stay on the model that answered its earlier turns, so follow-ups reuse its prompt cache.
         """
-        try:
-            response = ollama.chat(
-                model=self.llm,
-                messages=messages,
-                stream=False,
-                options={"keep_alive": "5m"},
-            )
-            return response["message"]["content"].strip()
-        except Exception as e:
-            logging.error(f"LLM request failed: {e}")
-            return f"LLM Error: {str(e)}"
+        if not (router.enabled and self.routing):
+            return [self.model]
+        tokens = sum(self.tokens(m["content"]) for m in messages)
+        reserve = self.context_window["reserve"]
+        return router.ranked(
+            task,
+            tokens,
+            context=lambda name: self.model_context(self.models[name]) - reserve,
+            pinned=self.memory.model if task == "answer" else None,
+        )
 
-    def prior_messages(self):
+    def attempts(self, messages, use_cache=True, task="answer", site="LocalLLM"):
+        """
+        Yields an Attempt per routed model, best first, for the caller to make its request in; the caller returns on the first success. After a stream failed part-way there is no fallback, since its text was already sent.
+        """
+        if task == "answer":
+            self.memory.failed = False
+        for name in self.routes(task, messages):
+            model = self.models[name]
+            key, cached = self.cached_response(messages, use_cache, model)
+            memory = self.memory if task == "answer" else None
+            attempt = Attempt(name, model, key, cached, use_cache, task, site, memory)
+            yield attempt
+            if attempt.parts:
+                return
+
+    def call_llm(self, messages, use_cache=True, task="answer", site="LocalLLM"):
+        """
+        Sends a list of messages (role + content) to the local LLM and returns its response as a string. Wraps Ollama's API call; identical requests are answered from the LLM response cache unless use_cache is False. If the routed model fails, the next candidate is tried.
+        """
+        for attempt in self.attempts(messages, use_cache, task, site):
+            if attempt.cached is not None:
+                return attempt.cached
+            with attempt as call:
+                call.send()
+                response = ollama.chat(
+                    model=attempt.model,
+                    messages=messages,
+                    stream=False,
+                    options=self.options(attempt.model),
+                )
+                call.ollama(response)
+                return attempt.done(response["message"]["content"])
+        return attempt.failure()
+
+    def options(self, model=None):
+        return {
+            "keep_alive": self.context_window["keep_alive"],
+            "num_ctx": self.model_context(model),
+        }
+
+    def cached_response(self, messages, use_cache=True, model=None):
+        """Returns the response cache key for messages, and the cached response if any."""
+        model = model or self.llm
+        key = llm_cache.make_key("ollama", model, messages, self.options(model))
+        return key, llm_cache.get(key) if use_cache else None
+
+    def stream_llm(self, messages, use_cache=True, task="answer", site="LocalLLM"):
         """
-        Retrieves the most recent messages from conversation history. Each user + assistant pair is effectively 2 messages, so we multiple by 2.
+        Streaming version of call_llm: yields the response as text deltas while the model generates it. A cached response is yielded in one piece. Falls back to the next routed model only if nothing was streamed yet.
         """
-        max_messages = self.conversation_limit * 2
-        return self.conversation_history[-max_messages:]
+        for attempt in self.attempts(messages, use_cache, task, site):
+            if attempt.cached is not None:
+                yield attempt.cached
+                return
+            with attempt as call:
+                call.send()
+                for chunk in ollama.chat(
+                    model=attempt.model,
+                    messages=messages,
+                    stream=True,
+                    options=self.options(attempt.model),
+                ):
+                    if chunk.get("done"):
+                        call.ollama(chunk)
+                    if chunk["message"]["content"]:
+                        yield attempt.delta(chunk["message"]["content"])
+                attempt.done()
+                return
+        yield attempt.failure()
 
-    def handle_chunking(self, query, context, multi_turn=False):
+    async def astream_llm(
+        self, messages, use_cache=True, task="answer", site="LocalLLM"
+    ):
         """
-        Breaks up a large prompt into smaller chunks and queries the model chunk by chunk. Then merges and summarizes the chunked responses into a single final response.
+        Async version of stream_llm, for use inside an event loop. Routing, the response cache and the model's options are blocking calls, so they run in a worker thread.
         """
-        chunks = self.chunk_text(context)
-        logging.info(f"Text split into {len(chunks)} chunks.")
-        chunked_responses = []
+        attempts = self.attempts(messages, use_cache, task, site)
+        failed = None
+        while True:
+            attempt = await asyncio.to_thread(next, attempts, None)
+            if attempt is None:
+                break
+            failed = attempt
+            if attempt.cached is not None:
+                yield attempt.cached
+                return
+            options = await asyncio.to_thread(self.options, attempt.model)
+            with attempt as call:
+                call.send()
+                stream = await ollama.AsyncClient().chat(
+                    model=attempt.model,
+                    messages=messages,
+                    stream=True,
+                    options=options,
+                )
+                async for chunk in stream:
+                    if chunk.get("done"):
+                        call.ollama(chunk)
+                    if chunk["message"]["content"]:
+                        yield attempt.delta(chunk["message"]["content"])
+                await asyncio.to_thread(attempt.done)
+                return
+        yield failed.failure()
+
+    def new_memory(self):
+        """Empty conversation memory, e.g. for a new session."""
+        return ConversationMemory(
+            self.conversation_limit,
+            self.memory_cfg["token_budget"],
+            summarize=self.summarize_turns,
+            count=self.tokens,
+        )
 
+    def summarize_turns(self, summary, turns):
+        """Folds older turns into the conversation's rolling summary."""
+        text = "\n\n".join(
+            f"User: {turn['query']}\nAssistant: {turn['response']}" for turn in turns
+        )
+        prompt = self.memory_prompt.format(
+            tokens=self.memory_cfg["summary_tokens"],
+            summary=summary or "(none)",
+            turns=text,
+        )
+        messages = [{"role": "user", "content": prompt}]
+        response = self.call_llm(messages, task="memory", site="summarize_turns")
+        if response.startswith("LLM Error:"):
+            raise RuntimeError(response)
+        return response
+
+    def prior_messages(self):
+        """
+        Recent conversation as chat messages: the rolling summary of older turns, then the latest questions and answers that fit in memory.token_budget.
+        """
+        return self.memory.messages()
+
+    def chunked_messages(self, query, context, multi_turn=False, summaries=None):
+        """
+        Summarizes each chunk of a large context (map) and returns the messages for the final merge call (reduce), so it can be sent with or without streaming. Precomputed chunk summaries of the context (see chunk_summaries.py) skip the map.
+        """
         # Retrieve recent conversation context if multi-turn
         prior_msgs = self.prior_messages() if multi_turn else []
 
-        # For each chunk, append the chunk to conversation context and query LLM
-        for i, chunk in enumerate(chunks):
-            logging.info(f"Chunk {i + 1}")
+        if summaries:
+            logging.info(f"Using {len(summaries)} precomputed chunk summaries.")
+        else:
+            chunks = self.chunk_text(context, self.chunk_size(query, prior_msgs))
+            logging.info(f"Text split into {len(chunks)} chunks.")
 
-            # Give LLM chunking context
-            messages = prior_msgs + [
-                {
-                    "role": "user",
-                    "content": f'###Task:\nYou are tasked with summarizing a chunk of text that belongs to a larger document. This document has been split into multiple smaller documents. You will be given one of these smaller documents. To achieve your task, you will concisely summarize the given document while retaining the critical information and including any numbers or statistics. To do this, you will ONLY use the text from the given document. Be sure to include any information that might help to answer this question: "{query}"\n\n### Document Part {i + 1}/{len(chunks)}:\n{chunk}',
-                }
-            ]
-            logging.debug(messages[0]["content"])
-            response = self.call_llm(messages)
-            logging.debug(f"\nResponse:\n{response}\n\n")
-            chunked_responses.append(response)
+        async def map_reduce():
+            mapped = summaries or self.drop_failed(
+                await self.map_chunks(query, chunks, prior_msgs)
+            )
+            return await self.reduce_summaries(query, mapped)
 
-        # Summarize all chunked responses
-        summary_prompt = self.chunked_summary.format(query=query) + "\n".join(
-            chunked_responses
-        )
+        # Summarize the remaining (fitting) summaries in a fresh prompt
+        summary_prompt = self.merge_prompt(query, run_coroutine(map_reduce()))
         logging.debug(summary_prompt)
+        return prior_msgs + [{"role": "user", "content": summary_prompt}]
 
-        # Combine the summarized chunks with the user prompt
-        messages = messages + [{"role": "user", "content": summary_prompt}]
-        final_response = self.call_llm(messages)
+    @staticmethod
+    def drop_failed(summaries):
+        """
+        Leaves out chunks whose summary failed, so no "LLM Error: ..." reaches the reduce prompt. Raises RuntimeError if none succeeded.
+        """
+        kept = [s for s in summaries if not s.startswith("LLM Error:")]
+        if not kept:
+            raise RuntimeError(summaries[0] if summaries else "No chunks to summarize")
+        if len(kept) < len(summaries):
+            logging.warning(
+                f"Leaving out {len(summaries) - len(kept)} failed chunk summaries."
+            )
+        return kept
 
-        return final_response
+    def merge_prompt(self, query, summaries):
+        return self.chunked_summary.format(query=query) + "\n".join(summaries)
 
-    def generate(self, query, context, prompt_format="concise", multi_turn=False):
-        """Generate a response with optional multi-turn conversation support."""
-        if multi_turn:
-            original_query = ""
-            previous_response = ""
+    def group_summaries(self, query, summaries):
+        """
+        Packs consecutive summaries into groups whose merge prompt fits the token limit. Always pairs up at least two per group, so each level shrinks.
+        """
+        budget = self.token_limit() - self.tokens(self.merge_prompt(query, []))
+        groups, current, size = [], [], 0
+        for summary in summaries:
+            tokens = self.tokens(summary) + 1
+            if len(current) >= 2 and size + tokens > budget:
+                groups.append(current)
+                current, size = [], 0
+            current.append(summary)
+            size += tokens
+        if current:
+            groups.append(current)
+        return groups
 
-            # Retrieve the most recent user+assistant pair
-            for history in reversed(self.conversation_history):
-                if history["role"] == "user" and not original_query:
-                    original_query = history["content"]
-                elif history["role"] == "assistant" and not previous_response:
-                    previous_response = history["content"]
-                if original_query and previous_response:
+    async def reduce_summaries(self, query, summaries):
+        """
+        Tree reduce: while the summaries do not fit in one merge prompt, merges budget-sized groups of them in parallel, one level at a time. Returns the summaries for the final merge.
+        """
+        client = ollama.AsyncClient()
+        limit = asyncio.Semaphore(self.chunking["concurrency"])
+
+        async def merge(group):
+            prompt = self.merge_prompt(query, group)
+            messages = [{"role": "user", "content": prompt}]
+            return await self.acall_llm(
+                messages, client, task="reduce", site="reduce_summaries", limit=limit
+            )
+
+        level = 0
+        while (
+            len(summaries) > 1
+            and self.tokens(self.merge_prompt(query, summaries)) > self.token_limit()
+        ):
+            level += 1
+            groups = self.group_summaries(query, summaries)
+            logging.info(f"Reduce level {level}: {len(groups)} groups.")
+            summaries = await asyncio.gather(*(merge(group) for group in groups))
+        return list(summaries)
+
+    @staticmethod
+    def chunk_prompt(query, chunk, i, n):
+        """
+        Gives the LLM chunking context for part i of n. Without a query (ingest-time summaries) the summary is not steered towards any question.
+        """
+        focus = (
+            f' Be sure to include any information that might help to answer this question: "{query}"'
+            if query
+            else ""
+        )
+        return f"###Task:\nYou are tasked with summarizing a chunk of text that belongs to a larger document. This document has been split into multiple smaller documents. You will be given one of these smaller documents. To achieve your task, you will concisely summarize the given document while retaining the critical information and including any numbers or statistics. To do this, you will ONLY use the text from the given document.{focus}\n\n### Document Part {i + 1}/{n}:\n{chunk}"
+
+    async def acall_llm(
+        self,
+        messages,
+        client=None,
+        use_cache=True,
+        task="answer",
+        site="LocalLLM",
+        limit=None,
+    ):
+        """
+        Async version of call_llm. A request waits for the semaphore limit (if given) before it is sent; the wait is recorded as its queue time.
+        """
+        for attempt in self.attempts(messages, use_cache, task, site):
+            if attempt.cached is not None:
+                return attempt.cached
+            with attempt as call:
+                async with limit or nullcontext():
+                    call.send()
+                    response = await (client or ollama.AsyncClient()).chat(
+                        model=attempt.model,
+                        messages=messages,
+                        stream=False,
+                        options=self.options(attempt.model),
+                    )
+                call.ollama(response)
+                return attempt.done(response["message"]["content"])
+        return attempt.failure()
+
+    async def map_chunks(self, query, chunks, prior_msgs=None):
+        """
+        Summarizes chunks concurrently (at most chunking.concurrency requests in flight, spread over chunking.hosts if several are configured). Results are returned in chunk order; a chunk that fails is retried once, and is returned as its "LLM Error: ..." if it fails again.
+        """
+        hosts = self.chunking.get("hosts") or [None]
+        clients = [ollama.AsyncClient(host=host) for host in hosts]
+        limit = asyncio.Semaphore(self.chunking["concurrency"])
+
+        async def summarize(i, chunk):
+            prompt = self.chunk_prompt(query, chunk, i, len(chunks))
+            messages = (prior_msgs or []) + [{"role": "user", "content": prompt}]
+            logging.info(f"Chunk {i + 1}")
+            for _ in range(2):
+                response = await self.acall_llm(
+                    messages,
+                    clients[i % len(clients)],
+                    task="chunk_summary",
+                    site="map_chunks",
+                    limit=limit,
+                )
+                if not response.startswith("LLM Error:"):
                     break
+            logging.debug(f"\nResponse:\n{response}\n\n")
+            return response
+
+        return await asyncio.gather(
+            *(summarize(i, chunk) for i, chunk in enumerate(chunks))
+        )
+
+    def context_budget(self, prompt_format="concise"):
+        """
+        Tokens available for retrieved context: the model's context window minus the prompt template and the space reserved for the response.
+        """
+        template = self.prompts[prompt_format].format_map(defaultdict(str))
+        return (
+            self.model_context()
+            - self.tokens(template)
+            - self.context_window["reserve"]
+        )
+
+    def build_prompt(self, query, context, prompt_format="concise", multi_turn=False):
+        """Fills the prompt template, adding the prior turn if multi-turn."""
+        if multi_turn:
+            # Retrieve the most recent user+assistant pair
+            last = self.memory.last_turn() or {}
+            original_query = last.get("query", "")
+            previous_response = last.get("response", "")
 
             # Build prompt using the stored multi-turn pieces
-            input_prompt = self.prompts[prompt_format].format(
+            return self.prompts[prompt_format].format(
                 user_query=query,
                 context=context,
                 original_query=original_query,
                 previous_response=previous_response,
             )
-        else:
-            # Single-turn prompt
-            input_prompt = self.prompts[prompt_format].format(
-                user_query=query, context=context
-            )
+
+        # Single-turn prompt
+        return self.prompts[prompt_format].format(user_query=query, context=context)
+
+    def remember(self, query, output):
+        """Update conversation memory with a question+answer pair."""
+        self.memory.add(query, output)
+
+    def generate(
+        self,
+        query,
+        context,
+        prompt_format="concise",
+        multi_turn=False,
+        summaries=None,
+    ):
+        """
+        Generate a response with optional multi-turn conversation support. summaries are precomputed chunk summaries of the context, used if it has to be chunked.
+        """
+        _, output = self.complete(query, context, prompt_format, multi_turn, summaries)
+        self.remember(query, output)
+        return output
+
+    def complete(
+        self,
+        query,
+        context,
+        prompt_format="concise",
+        multi_turn=False,
+        summaries=None,
+    ):
+        """
+        Generates a response without updating the conversation history, so single-turn calls can run concurrently. Returns the prompt and the response.
+        """
+        input_prompt, messages = self.final_messages(
+            query, context, prompt_format, multi_turn, summaries
+        )
+        return input_prompt, self.call_llm(messages, site="complete")
+
+    def final_messages(
+        self,
+        query,
+        context,
+        prompt_format="concise",
+        multi_turn=False,
+        summaries=None,
+    ):
+        """
+        Returns the filled prompt and the messages for the call that produces the answer. Contexts over the token limit are first summarized chunk by chunk (or reduced from precomputed summaries).
+        """
+        # Formats with a <format>_system prompt keep the context as a fixed prefix
+        if multi_turn and f"{prompt_format}_system" in self.prompts:
+            messages = self.prefix_messages(query, context, prompt_format)
+            tokens = sum(self.tokens(m["content"]) for m in messages)
+            if tokens <= self.token_limit():
+                logging.info("Follow-up on the cached context prefix.")
+                return query, messages
+
+        input_prompt = self.build_prompt(query, context, prompt_format, multi_turn)
 
         # If token limits exceeded; chunking required
-        tokens = token_count(input_prompt)
-        if tokens > self.chunking["limit"]:
+        tokens = self.tokens(input_prompt)
+        if tokens > self.token_limit():
             logging.info(f"Token count = {tokens}")
-            output = self.handle_chunking(query, context, multi_turn)
-        else:
-            logging.info("No chunking required.")
-            # Get prior messages if multi-turn
-            if multi_turn:
-                messages = self.prior_messages()
-            else:
-                messages = []
-            messages = messages + [{"role": "user", "content": input_prompt}]
-            output = self.call_llm(messages)
-
-        # Update conversation history
-        self.conversation_history.extend(
-            [
-                {"role": "user", "content": input_prompt},
-                {"role": "assistant", "content": output},
-            ]
+            messages = self.chunked_messages(query, context, multi_turn, summaries)
+            return input_prompt, messages
+
+        logging.info("No chunking required.")
+        # Get prior messages if multi-turn
+        messages = self.prior_messages() if multi_turn else []
+        return input_prompt, messages + [{"role": "user", "content": input_prompt}]
+
+    def prefix_messages(self, query, context, prompt_format="follow_up"):
+        """
+        Follow-up messages laid out for Ollama's prompt cache: the context in a fixed system message, then the earlier questions and answers, then the new question. Each turn only appends to the last one's prompt, so the model reuses its KV cache for the context and processes just the new tokens.
+        """
+        system = self.prompts[f"{prompt_format}_system"].format(context=context)
+        messages = [{"role": "system", "content": system}]
+        return messages + self.prior_messages() + [{"role": "user", "content": query}]
+
+    def generate_stream(
+        self,
+        query,
+        context,
+        prompt_format="concise",
+        multi_turn=False,
+        summaries=None,
+    ):
+        """
+        Streaming version of generate: yields text deltas as they arrive and records the full response in the conversation history at the end.
+        """
+        _, messages = self.final_messages(
+            query, context, prompt_format, multi_turn, summaries
         )
-        return output
+        parts = []
+        for delta in self.stream_llm(messages, site="generate_stream"):
+            parts.append(delta)
+            yield delta
+        self.remember(query, "".join(parts).strip())
+
+    async def agenerate_stream(
+        self,
+        query,
+        context,
+        prompt_format="concise",
+        multi_turn=False,
+        summaries=None,
+    ):
+        """Async version of generate_stream."""
+        # Chunk summaries (if any) are blocking calls; keep them off the loop
+        _, messages = await asyncio.to_thread(
+            self.final_messages, query, context, prompt_format, multi_turn, summaries
+        )
+        parts = []
+        async for delta in self.astream_llm(messages, site="agenerate_stream"):
+            parts.append(delta)
+            yield delta
+        # Remembering may summarize older turns (a blocking LLM call)
+        await asyncio.to_thread(self.remember, query, "".join(parts).strip())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+import time
+import threading
+from contextlib import contextmanager
+from utils.config import ConfigLoader
+from utils.metrics import metrics
+
+
+class ModelRouter:
+    """
+    Picks a local model per LLM call. Each task (answer, chunk_summary, reduce, memory, extraction) has a candidate list in llmConfig routing.tasks, in order of preference. A candidate is passed over when:
+    - its context window is too small for the prompt,
+    - it already has max_inflight calls running,
+    - it is cooling down after repeated errors, or
+    - its observed latency is over the task's budget.
+    Passed-over models are kept as fallbacks, least loaded first. A conversation can pin the model that answered it, which then goes first unless it is cooling down or too small for the prompt.
+    """
+
+    def __init__(self, settings=None):
+        cfg = ConfigLoader("llmConfig")
+        self.models = cfg.get_section("models")
+        self.settings = settings or cfg.get_section("routing")
+        self.enabled = self.settings["enabled"]
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def stat(self, model):
+        # latency: EWMA seconds per successful call, by task
+        # errors: EWMA failure rate
+        return self.stats.setdefault(
+            model, {"latency": {}, "errors": 0.0, "inflight": 0, "cooldown": 0.0}
+        )
+
+    def ranked(self, task, tokens=0, context=None, pinned=None):
+        """
+        Candidate models for a task (keys of llmConfig models), best first. context(model) gives a model's context window in tokens; pinned is a model to keep using if it can.
+        """
+        tasks = self.settings["tasks"]
+        candidates = tasks.get(task) or tasks["answer"]
+        if context is not None:
+            candidates = [m for m in candidates if context(m) >= tokens] or candidates
+        budget = self.settings["latency_budget"].get(task)
+        now = time.monotonic()
+
+        ready, overloaded = [], []
+        with self.lock:
+            for model in candidates:
+                s = self.stat(model)
+                slow = budget and s["latency"].get(task, 0.0) > budget
+                if (
+                    s["inflight"] >= self.settings["max_inflight"]
+                    or s["cooldown"] > now
+                    or slow
+                ):
+                    overloaded.append(model)
+                else:
+                    ready.append(model)
+            overloaded.sort(
+                key=lambda m: (
+                    self.stats[m]["cooldown"] > now,
+                    self.stats[m]["inflight"],
+                    self.stats[m]["latency"].get(task, 0.0),
+                )
+            )
+            ranked = ready + overloaded
+            # Switching models mid-conversation throws away its prompt cache
+            if pinned in candidates and self.stat(pinned)["cooldown"] <= now:
+                ranked.remove(pinned)
+                ranked.insert(0, pinned)
+        return ranked
+
+    @contextmanager
+    def track(self, model, task):
+        """Counts a call against the model while it runs and records its outcome."""
+        with self.lock:
+            self.stat(model)["inflight"] += 1
+        metrics.incr("llm_routed", model=model, task=task)
+        start, ok = time.perf_counter(), False
+        try:
+            yield
+            ok = True
+        except GeneratorExit:
+            ok = True  # a stream closed early by its consumer is not a failure
+            raise
+        finally:
+            self.record(model, task, time.perf_counter() - start, ok)
+
+    def record(self, model, task, seconds, ok):
+        alpha = self.settings["ewma_alpha"]
+        with self.lock:
+            s = self.stat(model)
+            s["inflight"] -= 1
+            if ok:
+                previous = s["latency"].get(task)
+                s["latency"][task] = (
+                    seconds
+                    if previous is None
+                    else alpha * seconds + (1 - alpha) * previous
+                )
+            s["errors"] = alpha * (0.0 if ok else 1.0) + (1 - alpha) * s["errors"]
+            if s["errors"] > self.settings["max_error_rate"]:
+                # Rest the model, then give it a fresh chance
+                s["cooldown"] = time.monotonic() + self.settings["cooldown_seconds"]
+                s["errors"] = 0.0
+                metrics.incr("llm_cooldowns", model=model)
+
+
+# Create a global instance to be imported anywhere
+router = ModelRouter()
@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import threading
+from dataclasses import replace
+from collections import OrderedDict
+from utils.config import config
+from utils.metrics import metrics
+from utils.budget import BudgetedExecutor
+from utils.onnx_model import OnnxModel
+
+
+def text_hash(text):
+    return hashlib.md5((text or "").encode("utf-8")).hexdigest()
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage reranker: scores query-passage pairs with a small cross-encoder exported to ONNX and run on CPU. Scores are cached by (query hash, passage hash), and a rerank that overruns its latency budget falls back to the first-stage order.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or config.get_section("search")["rerank"]
+        self.model = OnnxModel(self.settings)
+
+        # LRU of pair scores; a repeated query only scores unseen passages
+        self.scores = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+        # One worker per engine slot, so concurrent queries don't queue
+        # behind each other's budget
+        self.executor = BudgetedExecutor(
+            "rerank",
+            config.get_section("server")["engine_workers"],
+            self.settings["budget_ms"],
+            self.settings["queue_ms"],
+        )
+
+    def load(self):
+        """Loads (and if needed downloads) the model, e.g. at startup."""
+        self.model.load()
+
+    def score(self, query, passages):
+        """Scores every (query, passage) pair in one batched forward pass."""
+        _, outputs = self.model.run(query, passages)
+        return outputs[0].reshape(len(passages), -1)[:, 0].tolist()
+
+    def cached_scores(self, query, passages):
+        """Returns pair scores, only running the model on uncached pairs."""
+        query_hash = text_hash(query)
+        keys = [(query_hash, text_hash(p)) for p in passages]
+
+        with self.cache_lock:
+            found = {key: self.scores[key] for key in keys if key in self.scores}
+            for key in found:
+                self.scores.move_to_end(key)
+        metrics.incr("rerank_cache_hits", len(found))
+
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        if missing:
+            metrics.incr("rerank_cache_misses", len(missing))
+            new = self.score(query, [passages[i] for i in missing])
+            with self.cache_lock:
+                for i, value in zip(missing, new):
+                    found[keys[i]] = value
+                    self.scores[keys[i]] = value
+                while len(self.scores) > self.settings["cache_entries"]:
+                    self.scores.popitem(last=False)
+
+        return [found[key] for key in keys]
+
+    @staticmethod
+    def passage(hit):
+        return f"{hit.data.get('title') or ''}\n{hit.data.get('content') or ''}"
+
+    def rerank(self, query, hits):
+        """
+        Reorders hits by cross-encoder score. If scoring fails, waits longer than queue_ms for a worker or takes longer than budget_ms, the hits are returned in first-stage order (a late result still fills the cache for next time).
+        """
+        if len(hits) < 2 or self.model.unavailable:
+            return hits
+
+        passages = [self.passage(hit) for hit in hits]
+        try:
+            scores = self.executor.run(self.cached_scores, query, passages)
+        except TimeoutError as e:
+            metrics.incr("rerank_fallbacks", reason=str(e))
+            logging.warning(f"Rerank over its {e} limit; using first-stage order.")
+            return hits
+        except Exception as e:
+            metrics.incr("rerank_fallbacks", reason="error")
+            logging.error(f"Rerank failed; using first-stage order: {e}")
+            return hits
+
+        order = sorted(range(len(hits)), key=lambda i: scores[i], reverse=True)
+        return [replace(hits[i], score=scores[i]) for i in order]
+
+    def close(self):
+        self.executor.shutdown()
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from utils.config import config
+from utils.metrics import metrics
+
+
+def watermark_path():
+    path = config.get_section("search")["cache"]["watermark_path"]
+    return os.path.abspath(os.path.join(config.root, path))
+
+
+def bump_watermark(value):
+    """
+    Records a new ingest watermark (e.g. the max embedded article id). Cached retrievals made under an older watermark are invalidated, in every process that shares the file.
+    """
+    path = watermark_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(value))
+    os.replace(tmp, path)  # atomic, so readers never see a partial write
+    logging.info(f"Ingest watermark set to {value}.")
+
+
+class Watermark:
+    """Reads the ingest watermark, re-reading the file only when it changes."""
+
+    def __init__(self, path=None):
+        self.path = path or watermark_path()
+        self.mtime = None
+        self.value = None
+
+    def get(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self.mtime:
+            with open(self.path) as f:
+                self.value = f.read().strip()
+            self.mtime = mtime
+        return self.value
+
+
+def normalize_query(query):
+    """Lowercases, collapses whitespace and strips trailing punctuation."""
+    return " ".join(query.lower().split()).strip(" ?!.")
+
+
+_UNSET = object()
+
+
+class RetrievalCache:
+    """
+    LRU cache of retrieval results with a size bound and a TTL. Each entry also records the ingest watermark it was computed under and is dropped once the watermark moves.
+    """
+
+    def __init__(self, max_entries=512, ttl=600, watermark=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.watermark = watermark or Watermark()
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query, k, filters, backend, mode="vector", vectors=False):
+        """Normalized query + k + filters + mode (+ vectors) + backend."""
+        return (
+            normalize_query(query),
+            k,
+            json.dumps(filters or {}, sort_keys=True, default=str),
+            mode,
+            vectors,
+            backend,
+        )
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss."""
+        backend = key[-1]
+        current = self.watermark.get()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                metrics.incr("retrieval_cache_misses", backend=backend)
+                return None
+
+            value, expires, mark = entry
+            if mark != current or time.monotonic() > expires:
+                del self.entries[key]
+                metrics.incr("retrieval_cache_invalidations", backend=backend)
+                metrics.incr("retrieval_cache_misses", backend=backend)
+                return None
+
+            self.entries.move_to_end(key)
+            metrics.incr("retrieval_cache_hits", backend=backend)
+            return value
+
+    def put(self, key, value, mark=_UNSET):
+        """
+        Stores a value. Pass the watermark read before the retrieval ran, so data ingested mid-query cannot be cached under the newer mark.
+        """
+        mark = self.watermark.get() if mark is _UNSET else mark
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl, mark)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                metrics.incr("retrieval_cache_evictions", backend=key[-1])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
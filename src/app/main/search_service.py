@@ -0,0 +1,467 @@
+import time
+import queue
+import numpy as np
+import logging
+import threading
+from dataclasses import replace
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from utils.config import config
+from utils.metrics import stage_timer
+from datetime import datetime, timedelta, timezone
+from app.main.vector_store import PUBLISHED_TS, STORES, as_utc, get_store, to_epoch
+from app.main.retrieval_cache import RetrievalCache
+from app.main.context_packing import mmr, pack_context
+from app.main.reranker import CrossEncoderReranker
+from app.main.company_index import CompanyIndex
+
+
+class SearchService:
+    """
+    Long-lived similarity search over a vector store. Owns a small pool of health-checked store clients and the query settings, so per-query work is only the search itself. Create one per process with get_search_service().
+    """
+
+    def __init__(self, database=None):
+        self.settings = config.get_section("search")
+        self.database = database or self.settings["database"]
+
+        # Idle store clients; at most pool_size are ever open at once
+        self.pool = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(self.settings["pool_size"])
+        self.last_check = {}
+
+        # Repeated questions skip the vector store entirely
+        cache = self.settings["cache"]
+        self.cache = RetrievalCache(cache["max_entries"], cache["ttl"])
+
+        # Runs the lexical and vector halves of a hybrid search in parallel
+        self.executor = ThreadPoolExecutor(max_workers=self.settings["pool_size"])
+
+        # Cross-encoder second stage, loaded on first use
+        self.reranker = None
+        self.reranker_lock = threading.Lock()
+
+        # Company -> article postings, opened on first company-scoped query
+        self.companies = None
+        self.companies_lock = threading.Lock()
+
+    def create_store(self):
+        store = get_store(self.database)
+        self.last_check[id(store)] = time.monotonic()
+        logging.info(f"Opened {self.database} client for the search service.")
+        return store
+
+    def healthy(self, store):
+        """Re-checks a pooled client once its health check has expired."""
+        if time.monotonic() - self.last_check.get(id(store), 0) < self.settings[
+            "health_interval"
+        ]:
+            return True
+        ok = store.is_ready()
+        self.last_check[id(store)] = time.monotonic()
+        return ok
+
+    def discard(self, store):
+        self.last_check.pop(id(store), None)
+        try:
+            store.close()
+        except Exception as e:
+            logging.debug(f"Error closing {self.database} client: {e}")
+
+    @contextmanager
+    def acquire(self):
+        """
+        Checks a store client out of the pool (opening one if none are idle) and returns it afterwards. Unhealthy or failing clients are closed rather than returned.
+        """
+        self.slots.acquire()
+        store = None
+        try:
+            while store is None:
+                try:
+                    store = self.pool.get_nowait()
+                except queue.Empty:
+                    store = self.create_store()
+                    break
+                if not self.healthy(store):
+                    logging.warning(f"Dropping unhealthy {self.database} client.")
+                    self.discard(store)
+                    store = None
+
+            yield store
+            self.pool.put(store)
+
+        except Exception:
+            if store is not None:
+                self.discard(store)
+            raise
+
+        finally:
+            self.slots.release()
+
+    def company_articles(self, company):
+        """
+        Hashes of the articles that mention a company, from the ingest-time company index. None if the company is unknown or the index is unavailable.
+        """
+        try:
+            with self.companies_lock:
+                if self.companies is None:
+                    self.companies = CompanyIndex()
+                return self.companies.articles(company)
+        except Exception as e:
+            logging.error(f"Company index lookup failed: {e}")
+            return None
+
+    def build_filters(
+        self, category=None, tags=None, since=None, until=None, company=None
+    ):
+        """
+        Builds the filter dict pushed into the engines. A category maps to its configured tags; with explicit tags as well, an article needs one of each; since/until bound the published date. Without since, recency.max_age_days (if set) drops articles published before the start of that many days ago (UTC). A company known to the company index restricts the search to its articles, so one with no indexed articles matches nothing; an unknown company (or an unavailable index) doesn't filter.
+        """
+        filters = {}
+        if company:
+            hashes = self.company_articles(company)
+            if hashes is not None:
+                filters["hash"] = hashes
+        max_age = self.settings["recency"]["max_age_days"]
+        if not since and max_age:
+            # Whole days, so the filter (and the retrieval cache key built from
+            # it) only changes at midnight UTC, not on every call
+            today = datetime.now(timezone.utc).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+            since = today - timedelta(days=max_age)
+        # An article must carry one of the category's tags and one of the
+        # explicit tags
+        groups = [list(tags or []), self.settings["categories"].get(category or "", [])]
+        groups = [group for group in groups if group]
+        if groups:
+            filters["tags"] = groups if len(groups) > 1 else groups[0]
+        if since or until:
+            filters["published"] = {
+                "gte": as_utc(since) if since else None,
+                "lte": as_utc(until) if until else None,
+            }
+        return filters or None
+
+    def run_query(self, method, query, k, filters, include_vectors=False):
+        if matches_nothing(filters):
+            return []
+        with self.acquire() as store:
+            if method == "query":
+                return store.query(
+                    texts=[query], k=k, filters=filters, include_vectors=include_vectors
+                )[0]
+            return getattr(store, method)(texts=[query], k=k, filters=filters)[0]
+
+    def search(
+        self,
+        query,
+        k=None,
+        filters=None,
+        mode=None,
+        use_cache=True,
+        include_vectors=False,
+    ):
+        """
+        Performs a similarity ("vector") or "hybrid" search and returns the hits for the query. Hybrid runs a lexical and a vector search in parallel and fuses them with reciprocal rank fusion.
+        """
+        k = k or self.settings["k"]
+        mode = mode or self.settings["mode"]
+        key = RetrievalCache.make_key(
+            query, k, filters, self.database, mode, include_vectors
+        )
+        if use_cache:
+            hits = self.cache.get(key)
+            if hits is not None:
+                return hits
+
+        mark = self.cache.watermark.get()
+        if mode == "hybrid":
+            rankings = [
+                self.executor.submit(
+                    self.run_query, method, query, k, filters, include_vectors
+                )
+                for method in ("query", "keyword_query")
+            ]
+            hits = reciprocal_rank_fusion(
+                [future.result() for future in rankings], k, self.settings["rrf_k"]
+            )
+            if include_vectors:
+                hits = self.fill_vectors(hits)
+        else:
+            hits = self.run_query("query", query, k, filters, include_vectors)
+
+        self.cache.put(key, hits, mark)
+        return hits
+
+    def fill_vectors(self, hits):
+        """
+        Hybrid hits found only by the keyword search come without vectors; fetches them so MMR can compare those hits with the rest.
+        """
+        missing = [hit.id for hit in hits if hit.vector is None]
+        if not missing:
+            return hits
+        try:
+            with self.acquire() as store:
+                vectors = store.vectors(missing)
+        except Exception as e:
+            logging.warning(f"Could not fetch vectors of keyword-only hits: {e}")
+            return hits
+        return [
+            replace(hit, vector=vectors.get(hit.id)) if hit.vector is None else hit
+            for hit in hits
+        ]
+
+    def run_batch(self, method, queries, k, filters, include_vectors=False):
+        """
+        Runs many queries: in one call where the backend batches them (e.g. one embedding pass), otherwise one query per pooled client in parallel.
+        """
+        if matches_nothing(filters):
+            return [[] for _ in queries]
+        if STORES[self.database].batch_queries:
+            with self.acquire() as store:
+                if method == "query":
+                    return store.query(
+                        texts=queries,
+                        k=k,
+                        filters=filters,
+                        include_vectors=include_vectors,
+                    )
+                return getattr(store, method)(texts=queries, k=k, filters=filters)
+        futures = [
+            self.executor.submit(
+                self.run_query, method, query, k, filters, include_vectors
+            )
+            for query in queries
+        ]
+        return [future.result() for future in futures]
+
+    def search_many(
+        self,
+        queries,
+        k=None,
+        filters=None,
+        mode=None,
+        use_cache=True,
+        include_vectors=False,
+    ):
+        """
+        Batch counterpart of search(): returns one hit list per query. Repeated queries are searched once, cached ones are not searched at all, and the rest go to the backend together.
+        """
+        k = k or self.settings["k"]
+        mode = mode or self.settings["mode"]
+        keys = [
+            RetrievalCache.make_key(q, k, filters, self.database, mode, include_vectors)
+            for q in queries
+        ]
+
+        results, pending = {}, {}
+        for query, key in zip(queries, keys):
+            if key in results or key in pending:
+                continue
+            hits = self.cache.get(key) if use_cache else None
+            if hits is not None:
+                results[key] = hits
+            else:
+                pending[key] = query
+
+        if pending:
+            mark = self.cache.watermark.get()
+            texts = list(pending.values())
+            if mode == "hybrid":
+                vector = self.run_batch("query", texts, k, filters, include_vectors)
+                lexical = self.run_batch("keyword_query", texts, k, filters)
+                fetched = [
+                    reciprocal_rank_fusion(pair, k, self.settings["rrf_k"])
+                    for pair in zip(vector, lexical)
+                ]
+                if include_vectors:
+                    fetched = [self.fill_vectors(hits) for hits in fetched]
+            else:
+                fetched = self.run_batch("query", texts, k, filters, include_vectors)
+
+            for key, hits in zip(pending, fetched):
+                results[key] = hits
+                self.cache.put(key, hits, mark)
+
+        return [results[key] for key in keys]
+
+    def retrieve(self, query, k=None, filters=None, mode=None, use_cache=True):
+        """
+        Searches and formats the results: returns the top hit's fields and the combined content of all hits as LLM context.
+        """
+        hits = self.search(query, k=k, filters=filters, mode=mode, use_cache=use_cache)
+        return self.format_hits(hits)
+
+    def get_reranker(self):
+        with self.reranker_lock:
+            if self.reranker is None:
+                self.reranker = CrossEncoderReranker(self.settings["rerank"])
+            return self.reranker
+
+    def retrieve_context(
+        self,
+        query,
+        budget,
+        filters=None,
+        mode=None,
+        rerank=None,
+        recency=None,
+        timings=None,
+    ):
+        """
+        Multi-document retrieval: fetches candidates with their vectors, optionally reranks them with the cross-encoder, keeps a diverse subset with MMR, then packs their best passages into a token budget. Returns the top hit's fields, the packed context and the selected hits. Stage durations are written into timings if given.
+        """
+        with stage_timer("retrieve", timings):
+            candidates = self.search(
+                query,
+                k=self.candidate_count(rerank),
+                filters=filters,
+                mode=mode,
+                include_vectors=True,
+            )
+        return self.select_context(
+            query, candidates, budget, rerank, recency, timings
+        )
+
+    def candidate_count(self, rerank=None):
+        """Over-fetch when a reranker will cut the list back down."""
+        rerank = self.settings["rerank"]["enabled"] if rerank is None else rerank
+        if rerank:
+            return self.settings["rerank"]["candidates"]
+        return self.settings["context"]["candidates"]
+
+    def select_context(
+        self, query, candidates, budget, rerank=None, recency=None, timings=None
+    ):
+        """
+        Turns first-stage candidates into LLM context: optional rerank, optional recency weighting, MMR, then passage packing. Returns the top hit's fields, the packed context and the selected hits.
+        """
+        if not candidates:
+            return None, None, []
+
+        opts = self.settings["context"]
+        rerank = self.settings["rerank"]["enabled"] if rerank is None else rerank
+        if rerank:
+            with stage_timer("rerank", timings):
+                candidates = self.get_reranker().rerank(query, candidates)
+
+        # Blend relevance with freshness; a weight of 0 keeps pure relevance
+        decay = self.settings["recency"]
+        recency = decay["weight"] if recency is None else recency
+        if recency:
+            candidates = time_decay(candidates, recency, decay["half_life_days"])
+
+        with stage_timer("pack", timings):
+            hits = mmr(candidates, opts["documents"], opts["mmr_lambda"])
+            context = pack_context(query, hits, budget, opts["passage_tokens"])
+        retrieved_data, _ = self.format_hits(hits)
+        return retrieved_data, context, hits
+
+    def format_hits(self, hits):
+        """Returns the top hit's fields and the combined content as LLM context."""
+        if not hits:
+            return None, None
+
+        # Formatting retrieved data for the output
+        retrieved_data = []
+        for hit in hits:
+            data = dict(hit.data)
+            tags = data.get("tags") or "Unknown"
+            if isinstance(tags, str):
+                data["tags"] = [tag.strip() for tag in tags.split(",")]
+            for field in ("title", "published", "link"):
+                data.setdefault(field, "Unknown")
+            retrieved_data.append(data)
+
+        # Combine texts for LLM input (multiple docs if k > 1)
+        llm_context = "\n".join(data["content"] for data in retrieved_data)
+        return retrieved_data[0], llm_context
+
+    def warm_up(self):
+        """Opens one client up front so the first query skips connection setup."""
+        try:
+            with self.acquire():
+                pass
+            if self.settings["rerank"]["enabled"]:
+                self.get_reranker().load()
+        except Exception as e:
+            logging.error(f"Search service warm-up failed: {e}")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self.reranker is not None:
+            self.reranker.close()
+        if self.companies is not None:
+            self.companies.close()
+        while True:
+            try:
+                self.discard(self.pool.get_nowait())
+            except queue.Empty:
+                break
+
+
+def matches_nothing(filters):
+    """An empty id list (a company with no indexed articles) selects no records."""
+    return bool(filters) and filters.get("hash") == []
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=60):
+    """
+    Fuses ranked hit lists: each document scores sum(1 / (rrf_k + rank)) over the lists it appears in. Only ranks are used, so BM25 and cosine scores need no calibration.
+    """
+    scores, hits = {}, {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            scores[hit.id] = scores.get(hit.id, 0.0) + 1.0 / (rrf_k + rank)
+            hits.setdefault(hit.id, hit)
+
+    fused = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [replace(hits[i], score=scores[i]) for i in fused]
+
+
+def time_decay(hits, weight, half_life_days, now=None):
+    """
+    Re-scores hits as (1 - weight) * relevance + weight * 0.5 ** (age / half_life), with relevance min-max scaled to 0-1 so any first-stage or rerank score can be blended. Undated hits get no recency credit.
+    """
+    if not hits:
+        return hits
+    now = now or time.time()
+    scores = np.array([hit.score for hit in hits], dtype=np.float64)
+    span = scores.max() - scores.min()
+    relevance = (scores - scores.min()) / span if span else np.ones_like(scores)
+
+    published = [
+        hit.data.get(PUBLISHED_TS) or to_epoch(hit.data.get("published"))
+        for hit in hits
+    ]
+    freshness = np.array(
+        [
+            0.5 ** (max(now - ts, 0) / (half_life_days * 86400)) if ts else 0.0
+            for ts in published
+        ]
+    )
+
+    blended = (1 - weight) * relevance + weight * freshness
+    order = np.argsort(-blended, kind="stable")
+    return [replace(hits[i], score=float(blended[i])) for i in order]
+
+
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_search_service(database=None):
+    """Returns the process-wide SearchService for a database (created once)."""
+    database = database or config.get_section("search")["database"]
+    with _services_lock:
+        if database not in _services:
+            _services[database] = SearchService(database)
+        return _services[database]
+
+
+def close_search_services():
+    with _services_lock:
+        for service in _services.values():
+            service.close()
+        _services.clear()
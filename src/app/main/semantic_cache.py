@@ -0,0 +1,86 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from utils.metrics import metrics
+from app.main.vector_store import InMemoryStore, default_embedder
+
+
+class SemanticCache:
+    """
+    Caches recent answers by query embedding. A new query is answered from cache when it is similar enough to a recent one (cosine >= threshold) AND retrieval returned the same article set, so the answer would be built from identical context.
+    """
+
+    def __init__(self, threshold=0.92, max_entries=256, ttl=1800, embed_fn=None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed_fn = embed_fn
+
+        # Small in-process index of recent query embeddings
+        self.index = InMemoryStore(fields=["hash", "query", "answer", "articles"])
+        self.expiry = OrderedDict()
+        self.lock = threading.Lock()
+
+    def embed(self, query):
+        if self.embed_fn is None:
+            self.embed_fn = default_embedder()
+        return list(self.embed_fn([query])[0])
+
+    @staticmethod
+    def entry_id(query):
+        normalized = " ".join(query.lower().split())
+        return hashlib.md5(normalized.encode("utf-8")).hexdigest()
+
+    def lookup(self, vector, articles):
+        """
+        Returns the cached answer for the nearest recent query, or None if it is not similar enough, has expired, or used different articles.
+        """
+        with self.lock:
+            self.expire()
+            hits = self.index.query(vectors=[vector], k=1)[0]
+
+        if (
+            hits
+            and hits[0].score >= self.threshold
+            and hits[0].data["articles"] == sorted(articles)
+        ):
+            metrics.incr("semantic_cache_hits")
+            logging.info(
+                f"Semantic cache hit ({hits[0].score:.3f}): {hits[0].data['query']}"
+            )
+            return hits[0].data["answer"]
+
+        metrics.incr("semantic_cache_misses")
+        return None
+
+    def store(self, query, vector, articles, answer):
+        """Caches an answer. Empty answers are never cached (nor are failed ones; callers skip those)."""
+        if not answer or not answer.strip():
+            return
+        entry = self.entry_id(query)
+        record = {
+            "hash": entry,
+            "query": query,
+            "answer": answer,
+            "articles": sorted(articles),
+            "vector": vector,
+        }
+        with self.lock:
+            self.index.upsert([record])
+            self.expiry[entry] = time.monotonic() + self.ttl
+            self.expiry.move_to_end(entry)
+
+            # Drop the oldest entries beyond the size bound
+            while len(self.expiry) > self.max_entries:
+                oldest, _ = self.expiry.popitem(last=False)
+                self.index.delete([oldest])
+
+    def expire(self):
+        now = time.monotonic()
+        stale = [entry for entry, expires in self.expiry.items() if expires < now]
+        for entry in stale:
+            del self.expiry[entry]
+        if stale:
+            self.index.delete(stale)
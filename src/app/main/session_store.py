@@ -0,0 +1,351 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Protocol, runtime_checkable
+from utils.config import config
+from utils.metrics import metrics
+
+"""
+========
+Summary:
+========
+ - Defines a common SessionStore interface for CIA conversations.
+ - A session is its conversation state (ConversationMemory.to_dict()) and the hash of the article it is about. Article text is stored once per hash and shared by every session that references it.
+ - Implementations: an in-process LRU with a TTL and a byte budget ("memory"), a SQLite file shared by the workers on one machine ("sqlite"), and Redis ("redis"; pass a fakeredis client in tests).
+"""
+
+
+@runtime_checkable
+class SessionStore(Protocol):
+    """Interface shared by all session store backends."""
+
+    def load(self, session_id: str) -> dict | None:
+        """
+        Returns {"conversation": ..., "article_hash": ...} for a live session (refreshing its TTL), or None if it is unknown or expired.
+        """
+        ...
+
+    def article(self, article_hash: str) -> str | None:
+        """Returns the stored text of an article, or None."""
+        ...
+
+    def save(
+        self,
+        session_id: str,
+        conversation: dict,
+        article_hash: str,
+        article: str = None,
+    ) -> None:
+        """
+        Stores a session. The article text is only needed the first time a hash is seen; later sessions just reference it.
+        """
+        ...
+
+    def delete(self, session_id: str) -> None:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+def size(text):
+    return len(text.encode("utf-8"))
+
+
+class InMemorySessionStore:
+    """
+    Sessions in process memory, least recently used first. Sessions idle for longer than ttl expire, and the oldest are evicted while the total size of conversations and articles is over max_bytes. An article is dropped with the last session that references it.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or config.get_section("sessions")
+        self.ttl = self.settings["ttl"]
+        self.max_bytes = self.settings["max_bytes"]
+        self.sessions = OrderedDict()  # id -> {"conversation", "article_hash", ...}
+        self.articles = {}  # hash -> {"content", "bytes", "refs"}
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def load(self, session_id):
+        now = time.time()
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return None
+            if now - entry["used"] > self.ttl:
+                self.drop(session_id)
+                metrics.incr("session_expired", backend="memory")
+                return None
+            entry["used"] = now
+            self.sessions.move_to_end(session_id)
+            conversation = entry["conversation"]
+            article_hash = entry["article_hash"]
+        return {"conversation": json.loads(conversation), "article_hash": article_hash}
+
+    def article(self, article_hash):
+        with self.lock:
+            stored = self.articles.get(article_hash)
+            return stored["content"] if stored else None
+
+    def save(self, session_id, conversation, article_hash, article=None):
+        conversation = json.dumps(conversation)
+        with self.lock:
+            if article_hash not in self.articles:
+                if article is None:
+                    logging.warning(f"No article text for session {session_id}.")
+                    return
+                self.articles[article_hash] = {
+                    "content": article,
+                    "bytes": size(article),
+                    "refs": 0,
+                }
+                self.bytes += self.articles[article_hash]["bytes"]
+            # Reference the article before releasing the old entry, so a
+            # follow-up on the only session using it doesn't drop it
+            self.articles[article_hash]["refs"] += 1
+            if session_id in self.sessions:
+                self.drop(session_id)
+            self.sessions[session_id] = {
+                "conversation": conversation,
+                "article_hash": article_hash,
+                "bytes": size(conversation),
+                "used": time.time(),
+            }
+            self.bytes += self.sessions[session_id]["bytes"]
+            self.evict()
+
+    def drop(self, session_id):
+        """Removes a session, and its article if no other session uses it."""
+        entry = self.sessions.pop(session_id)
+        self.bytes -= entry["bytes"]
+        stored = self.articles[entry["article_hash"]]
+        stored["refs"] -= 1
+        if stored["refs"] == 0:
+            del self.articles[entry["article_hash"]]
+            self.bytes -= stored["bytes"]
+
+    def evict(self):
+        # Least recently used first, so expired sessions are at the front
+        now = time.time()
+        while self.sessions:
+            oldest = next(iter(self.sessions))
+            if now - self.sessions[oldest]["used"] <= self.ttl:
+                break
+            self.drop(oldest)
+            metrics.incr("session_expired", backend="memory")
+        # The newest session stays even if it alone is over budget
+        while self.bytes > self.max_bytes and len(self.sessions) > 1:
+            self.drop(next(iter(self.sessions)))
+            metrics.incr("session_evictions", backend="memory")
+
+    def delete(self, session_id):
+        with self.lock:
+            if session_id in self.sessions:
+                self.drop(session_id)
+
+    def close(self):
+        pass
+
+
+SQLITE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        conversation TEXT NOT NULL,
+        article_hash TEXT NOT NULL,
+        used REAL NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS session_articles (
+        hash TEXT PRIMARY KEY,
+        content TEXT NOT NULL
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS sessions_used ON sessions (used);",
+]
+
+
+class SQLiteSessionStore:
+    """
+    Sessions in a SQLite file, shared by every uvicorn worker on the machine. Idle sessions expire after ttl, at most max_sessions are kept (least recently used are evicted), and articles no session references are deleted.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or config.get_section("sessions")
+        self.ttl = self.settings["ttl"]
+        self.path = os.path.abspath(os.path.join(config.root, self.settings["path"]))
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")  # readers don't block writers
+            for statement in SQLITE_TABLES:
+                conn.execute(statement)
+            conn.commit()
+            self.conn = conn
+        return self.conn
+
+    def load(self, session_id):
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            row = conn.execute(
+                "SELECT conversation, article_hash, used FROM sessions WHERE id = ?",
+                (session_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[2] > self.ttl:
+                conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self.delete_orphans(conn)
+                conn.commit()
+                metrics.incr("session_expired", backend="sqlite")
+                return None
+            conn.execute("UPDATE sessions SET used = ? WHERE id = ?", (now, session_id))
+            conn.commit()
+        return {"conversation": json.loads(row[0]), "article_hash": row[1]}
+
+    def article(self, article_hash):
+        with self.lock:
+            row = (
+                self.connect()
+                .execute(
+                    "SELECT content FROM session_articles WHERE hash = ?",
+                    (article_hash,),
+                )
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def save(self, session_id, conversation, article_hash, article=None):
+        now = time.time()
+        with self.lock:
+            conn = self.connect()
+            if article is not None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO session_articles VALUES (?, ?)",
+                    (article_hash, article),
+                )
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(conversation), article_hash, now),
+            )
+            expired = conn.execute(
+                "DELETE FROM sessions WHERE used < ?", (now - self.ttl,)
+            ).rowcount
+            evicted = conn.execute(
+                """
+                DELETE FROM sessions WHERE id IN (
+                    SELECT id FROM sessions ORDER BY used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.settings["max_sessions"],),
+            ).rowcount
+            if expired or evicted:
+                self.delete_orphans(conn)
+            conn.commit()
+        if expired:
+            metrics.incr("session_expired", expired, backend="sqlite")
+        if evicted:
+            metrics.incr("session_evictions", evicted, backend="sqlite")
+
+    @staticmethod
+    def delete_orphans(conn):
+        """Deletes articles that no session references any more."""
+        conn.execute(
+            """
+            DELETE FROM session_articles
+            WHERE hash NOT IN (SELECT article_hash FROM sessions)
+            """
+        )
+
+    def delete(self, session_id):
+        with self.lock:
+            conn = self.connect()
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self.delete_orphans(conn)
+            conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class RedisSessionStore:
+    """
+    Sessions in Redis, shared by every worker that can reach it. Sessions and articles are separate keys with a sliding TTL; an article's TTL is extended whenever a session using it is touched, so it lives as long as its longest-lived session. Memory limits are left to the server's maxmemory policy.
+    """
+
+    def __init__(self, settings=None, client=None):
+        self.settings = settings or config.get_section("sessions")
+        self.ttl = self.settings["ttl"]
+        self.prefix = self.settings["prefix"]
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(self.settings["redis_url"])
+        self.client = client
+
+    def session_key(self, session_id):
+        return f"{self.prefix}:session:{session_id}"
+
+    def article_key(self, article_hash):
+        return f"{self.prefix}:article:{article_hash}"
+
+    def load(self, session_id):
+        key = self.session_key(session_id)
+        raw = self.client.get(key)
+        if raw is None:
+            return None
+        session = json.loads(raw)
+        pipe = self.client.pipeline()
+        pipe.expire(key, self.ttl)
+        pipe.expire(self.article_key(session["article_hash"]), self.ttl)
+        pipe.execute()
+        return session
+
+    def article(self, article_hash):
+        raw = self.client.get(self.article_key(article_hash))
+        if raw is None:
+            return None
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    def save(self, session_id, conversation, article_hash, article=None):
+        session = {"conversation": conversation, "article_hash": article_hash}
+        pipe = self.client.pipeline()
+        if article is not None:
+            pipe.set(self.article_key(article_hash), article, ex=self.ttl, nx=True)
+        pipe.expire(self.article_key(article_hash), self.ttl)
+        pipe.set(self.session_key(session_id), json.dumps(session), ex=self.ttl)
+        pipe.execute()
+
+    def delete(self, session_id):
+        self.client.delete(self.session_key(session_id))
+
+    def close(self):
+        self.client.close()
+
+
+SESSION_STORES = {
+    "memory": InMemorySessionStore,
+    "sqlite": SQLiteSessionStore,
+    "redis": RedisSessionStore,
+}
+
+
+def get_session_store(settings=None, **kwargs):
+    """Creates the SessionStore registered under the configured backend."""
+    settings = settings or config.get_section("sessions")
+    backend = settings["backend"]
+    if backend not in SESSION_STORES:
+        raise KeyError(f"Session store [{backend}] not found")
+    return SESSION_STORES[backend](settings, **kwargs)
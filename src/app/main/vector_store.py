@@ -0,0 +1,664 @@
+import re
+import math
+import logging
+import numpy as np
+from collections import Counter
+from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from typing import Any, Protocol, runtime_checkable
+from utils.config import ConfigLoader
+
+"""
+========
+Summary:
+========
+ - Defines a common VectorStore interface (batched upsert, query, delete).
+ - Implements it for Weaviate, ChromaDB and an in-process numpy index.
+ - Records are dicts keyed by the config fields; "hash" is the record id and an optional "vector" holds a precomputed embedding.
+ - Filters are a dict pushed down into each engine:
+     {field: value}                 equality
+     {field: [a, b]}                matches any of the values (tags: any tag)
+     {"tags": [[a, b], [c]]}        has any tag of every group (category AND tags)
+     {field: {"gte": x, "lte": y}}  range (published takes datetimes)
+"""
+
+
+@dataclass
+class Hit:
+    """A single query result."""
+
+    # Record id (the article hash)
+    id: str
+
+    # Similarity score; higher is more similar
+    score: float
+
+    # Stored fields (title, link, content, ...)
+    data: dict[str, Any] = field(default_factory=dict)
+
+    # Stored embedding, when requested
+    vector: list[float] = field(default=None)
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    """Interface shared by all vector store backends."""
+
+    name: str
+    fields: list[str]
+
+    # True if one query() call serves many queries (e.g. batched embedding)
+    batch_queries: bool
+
+    def upsert(self, records: list[dict], batch_size: int = 100) -> int:
+        """Inserts or overwrites records; returns how many were sent."""
+        ...
+
+    def query(
+        self,
+        vectors: list[list[float]] = None,
+        k: int = 1,
+        filters: dict = None,
+        texts: list[str] = None,
+        include_vectors: bool = False,
+    ) -> list[list[Hit]]:
+        """
+        Returns the top-k hits for each query vector (or for each query text, which the backend vectorizes itself).
+        """
+        ...
+
+    def keyword_query(
+        self, texts: list[str], k: int = 1, filters: dict = None
+    ) -> list[list[Hit]]:
+        """Lexical (BM25 or full-text) top-k hits for each query text."""
+        ...
+
+    def vectors(self, ids: list[str]) -> dict[str, list[float]]:
+        """Stored embeddings of records by id; unknown ids are left out."""
+        ...
+
+    def delete(self, ids: list[str]) -> None:
+        """Deletes records by id."""
+        ...
+
+    def is_ready(self) -> bool:
+        """Health check; False if the backend cannot serve queries."""
+        ...
+
+    def close(self) -> None:
+        """Releases the backend connection."""
+        ...
+
+
+def default_embedder():
+    """
+    The embedding function ChromaDB uses by default (all-MiniLM-L6-v2 via ONNX). Used wherever we need to embed text in-process.
+    """
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+    return DefaultEmbeddingFunction()
+
+
+# Every backend stores the publish time as epoch seconds under this key
+PUBLISHED_TS = "published_ts"
+
+
+def split_tags(value):
+    """Normalizes tags stored as a list, "a, b", "{a,b}" or "['a', 'b']"."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.strip().strip("{}[]").split(",")
+    tags = [str(tag).strip().strip("'\"").strip() for tag in value]
+    return [tag for tag in tags if tag and tag != "not found"]
+
+
+def tag_groups(value):
+    """
+    A tags filter as groups that must all match, each by any of its tags: a list of tag lists, or one list (or string) of tags.
+    """
+    nested = isinstance(value, (list, tuple)) and any(
+        isinstance(v, (list, tuple)) for v in value
+    )
+    if nested:
+        return [split_tags(group) for group in value]
+    return [split_tags(value)]
+
+
+def tag_key(tag):
+    """Metadata key flagging a tag, for engines without list metadata."""
+    return "tag_" + re.sub(r"\W+", "_", tag.lower()).strip("_")
+
+
+def as_utc(value):
+    """Datetimes are treated as UTC when they carry no timezone."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def to_epoch(value):
+    """Seconds since the epoch for a datetime or ISO string (None if unparsable)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return as_utc(value).timestamp()
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def tokenize(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def build_lexicon(documents):
+    """Term statistics for BM25 over a {id: text} mapping."""
+    terms = {i: Counter(tokenize(text)) for i, text in documents.items()}
+    doc_freq = Counter()
+    for counts in terms.values():
+        doc_freq.update(counts.keys())
+    lengths = {i: sum(counts.values()) for i, counts in terms.items()}
+    avg_len = sum(lengths.values()) / max(len(lengths), 1)
+    return terms, doc_freq, lengths, avg_len
+
+
+def bm25_scores(text, lexicon, k1=1.5, b=0.75):
+    """BM25 score of every document that shares a term with the text."""
+    terms, doc_freq, lengths, avg_len = lexicon
+    n_docs = len(terms)
+    scores = {}
+    for term in set(tokenize(text)):
+        if term not in doc_freq:
+            continue
+        idf = math.log(1 + (n_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+        for i, counts in terms.items():
+            tf = counts.get(term)
+            if tf:
+                norm = tf + k1 * (1 - b + b * lengths[i] / max(avg_len, 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / norm
+    return scores
+
+
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class WeaviateStore:
+    """VectorStore backed by the Weaviate collection (or alias) in config."""
+
+    name = "weaviate"
+    batch_queries = False  # near_text runs one request per query
+
+    def __init__(self, cfg=None, collection=None, client=None):
+        import weaviate
+        from weaviate.classes.query import MetadataQuery
+        from app.main.weaviate_collections import resolve_alias
+
+        self.cfg = cfg or ConfigLoader("config").get_section("weaviate")
+        self.fields = list(self.cfg["fields"])
+        self.client = client or weaviate.connect_to_local(port=self.cfg["port"])
+
+        # Query through the alias so rebuilds are picked up on swap
+        name = collection or self.cfg["dbname"]
+        self.target = resolve_alias(self.client, name) or name
+        self.collection = self.client.collections.get(name)
+        logging.debug(f"Weaviate store {name} -> {self.target}")
+
+        # Prepared once; every query asks for the same metadata
+        self.return_metadata = MetadataQuery(distance=True)
+        self.bm25_metadata = MetadataQuery(score=True)
+
+    def upsert(self, records, batch_size=100):
+        from app.main.weaviate_collections import object_uuid, to_properties
+
+        with self.collection.batch.fixed_size(batch_size=batch_size) as batch:
+            for record in records:
+                data = {k: v for k, v in record.items() if k in self.fields}
+                batch.add_object(
+                    properties=to_properties(data),
+                    uuid=object_uuid(record["hash"]),
+                    vector=record.get("vector"),
+                )
+
+        failed = self.collection.batch.failed_objects
+        if failed:
+            logging.error(f"{len(failed)} objects failed to upsert into Weaviate.")
+        return len(records) - len(failed)
+
+    def to_filter(self, filters):
+        """Translates a filter dict into a Weaviate filter."""
+        from weaviate.classes.query import Filter
+
+        if not filters:
+            return None
+        conditions = []
+        for key, value in filters.items():
+            prop = Filter.by_property(key)
+            if isinstance(value, dict):
+                if value.get("gte") is not None:
+                    conditions.append(prop.greater_or_equal(as_utc(value["gte"])))
+                if value.get("lte") is not None:
+                    conditions.append(prop.less_or_equal(as_utc(value["lte"])))
+            elif key == "tags":
+                for group in tag_groups(value):
+                    conditions.append(prop.contains_any(group))
+            elif isinstance(value, (list, tuple, set)):
+                conditions.append(prop.contains_any(list(value)))
+            else:
+                conditions.append(prop.equal(value))
+        if not conditions:
+            return None
+        return Filter.all_of(conditions) if len(conditions) > 1 else conditions[0]
+
+    def query(self, vectors=None, k=1, filters=None, texts=None, include_vectors=False):
+        where = self.to_filter(filters)
+        options = dict(
+            limit=k,
+            filters=where,
+            return_metadata=self.return_metadata,
+            include_vector=include_vectors,
+        )
+
+        results = []
+        for vector in vectors or []:
+            response = self.collection.query.near_vector(near_vector=vector, **options)
+            results.append(self.to_hits(response))
+        for text in texts or []:
+            response = self.collection.query.near_text(query=text, **options)
+            results.append(self.to_hits(response))
+        return results
+
+    def keyword_query(self, texts, k=1, filters=None):
+        """BM25 over the vectorized (content) properties."""
+        where = self.to_filter(filters)
+        return [
+            self.to_hits(
+                self.collection.query.bm25(
+                    query=text,
+                    limit=k,
+                    filters=where,
+                    return_metadata=self.bm25_metadata,
+                ),
+                lexical=True,
+            )
+            for text in texts
+        ]
+
+    def to_hits(self, response, lexical=False):
+        hits = []
+        for obj in response.objects:
+            vector = obj.vector.get("default") if obj.vector else None
+            if lexical:
+                score = obj.metadata.score or 0.0
+            else:
+                score = 1.0 - (obj.metadata.distance or 0.0)
+            hits.append(
+                Hit(
+                    id=obj.properties.get("hash", str(obj.uuid)),
+                    score=score,
+                    data={
+                        f: obj.properties.get(f)
+                        for f in self.fields + [PUBLISHED_TS]
+                        if f in obj.properties
+                    },
+                    vector=vector,
+                )
+            )
+        return hits
+
+    def vectors(self, ids):
+        from weaviate.classes.query import Filter
+
+        if not ids:
+            return {}
+        response = self.collection.query.fetch_objects(
+            filters=Filter.by_property("hash").contains_any(list(ids)),
+            limit=len(ids),
+            include_vector=True,
+        )
+        return {hit.id: hit.vector for hit in self.to_hits(response) if hit.vector}
+
+    def delete(self, ids):
+        from weaviate.classes.query import Filter
+
+        if ids:
+            self.collection.data.delete_many(
+                where=Filter.by_property("hash").contains_any(list(ids))
+            )
+
+    def is_ready(self):
+        try:
+            return self.client.is_ready()
+        except Exception:
+            return False
+
+    def close(self):
+        self.client.close()
+
+
+def similarity(distance, space):
+    """
+    Turns a ChromaDB distance into a similarity, higher is better. Cosine and ip distances are 1 - similarity; l2 is the squared distance, which for normalized embeddings is 2 - 2 * cosine.
+    """
+    if space == "l2":
+        return 1.0 - distance / 2
+    return 1.0 - distance
+
+
+class ChromaStore:
+    """VectorStore backed by the persistent ChromaDB collection in config."""
+
+    name = "chroma"
+    batch_queries = True
+
+    def __init__(self, cfg=None, collection=None, client=None, space="cosine"):
+        import chromadb
+
+        self.cfg = cfg or ConfigLoader("config").get_section("chroma")
+        self.fields = list(self.cfg["data"])
+        self.metadata = list(self.cfg["metadata"])
+        self.client = client or chromadb.PersistentClient(path=self.cfg["root"])
+        self.collection = self.client.get_or_create_collection(
+            name=collection or self.cfg["dbname"],
+            metadata={"hnsw:space": space} if space else None,
+        )
+        # A collection keeps the space it was created with (Chroma's default is l2)
+        self.space = (self.collection.metadata or {}).get("hnsw:space", "l2")
+
+        # Chroma has no lexical search; use PostgreSQL full-text instead
+        self.keywords = None
+
+    def to_metadata(self, record):
+        """
+        ChromaDB doesn’t support certain dtypes in metadata. Must ensure all metadata values are converted to strings.
+        """
+        metadata = {}
+        for key in self.metadata:
+            if key in record:
+                value = record[key]
+                if isinstance(value, (list, dict, tuple, set, bytes)):
+                    value = str(value)
+                elif isinstance(value, datetime):
+                    value = value.isoformat()  # (YYYY-MM-DD HH:MM:SS)
+                metadata[key] = value
+
+        # Filterable forms: numeric publish time and one flag per tag
+        published = to_epoch(record.get("published"))
+        if published is not None:
+            metadata[PUBLISHED_TS] = published
+        for tag in split_tags(record.get("tags")):
+            metadata[tag_key(tag)] = True
+        return metadata
+
+    def upsert(self, records, batch_size=100):
+        for batch in _batches(records, batch_size):
+            vectors = [r["vector"] for r in batch if r.get("vector") is not None]
+            self.collection.upsert(
+                ids=[r["hash"] for r in batch],
+                documents=[r["content"] for r in batch],
+                metadatas=[self.to_metadata(r) for r in batch],
+                embeddings=vectors if len(vectors) == len(batch) else None,
+            )
+        return len(records)
+
+    def to_where(self, filters):
+        """Translates a filter dict into a ChromaDB where clause."""
+        if not filters:
+            return None
+        conditions = []
+        for key, value in filters.items():
+            if key == "published" and isinstance(value, dict):
+                if value.get("gte") is not None:
+                    conditions.append({PUBLISHED_TS: {"$gte": to_epoch(value["gte"])}})
+                if value.get("lte") is not None:
+                    conditions.append({PUBLISHED_TS: {"$lte": to_epoch(value["lte"])}})
+            elif isinstance(value, dict):
+                for op in ("gte", "lte"):
+                    if value.get(op) is not None:
+                        conditions.append({key: {f"${op}": value[op]}})
+            elif key == "tags":
+                for group in tag_groups(value):
+                    flags = [{tag_key(tag): True} for tag in group]
+                    conditions.append({"$or": flags} if len(flags) > 1 else flags[0])
+            elif isinstance(value, (list, tuple, set)):
+                conditions.append({key: {"$in": list(value)}})
+            else:
+                conditions.append({key: value})
+        if not conditions:
+            return None
+        return {"$and": conditions} if len(conditions) > 1 else conditions[0]
+
+    def query(self, vectors=None, k=1, filters=None, texts=None, include_vectors=False):
+        include = ["documents", "metadatas", "distances"]
+        if include_vectors:
+            include.append("embeddings")
+        options = dict(n_results=k, where=self.to_where(filters), include=include)
+
+        results = []
+        if vectors:
+            results += self.to_hits(
+                self.collection.query(query_embeddings=vectors, **options)
+            )
+        if texts:
+            results += self.to_hits(self.collection.query(query_texts=texts, **options))
+        return results
+
+    def to_hits(self, response):
+        """Chroma returns one list per query for every included field."""
+        embeddings = response.get("embeddings")
+        results = []
+        for i, ids in enumerate(response["ids"]):
+            hits = []
+            for j, hit_id in enumerate(ids):
+                metadata = response["metadatas"][i][j] or {}
+                data = {"hash": hit_id, "content": response["documents"][i][j]}
+                data.update(metadata)
+                vector = embeddings[i][j] if embeddings is not None else None
+                hits.append(
+                    Hit(
+                        id=hit_id,
+                        score=similarity(response["distances"][i][j], self.space),
+                        data=data,
+                        vector=list(vector) if vector is not None else None,
+                    )
+                )
+            results.append(hits)
+        return results
+
+    def keyword_query(self, texts, k=1, filters=None):
+        if self.keywords is None:
+            from app.main.keyword_search import PostgresKeywordSearch
+
+            self.keywords = PostgresKeywordSearch(fields=self.fields)
+        return self.keywords.query(texts, k=k, filters=filters)
+
+    def vectors(self, ids):
+        if not ids:
+            return {}
+        response = self.collection.get(ids=list(ids), include=["embeddings"])
+        embeddings = response.get("embeddings")
+        if embeddings is None:
+            return {}
+        return {
+            hit_id: list(vector)
+            for hit_id, vector in zip(response["ids"], embeddings)
+            if vector is not None
+        }
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=list(ids))
+
+    def is_ready(self):
+        try:
+            self.client.heartbeat()
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        # PersistentClient has no connection to release
+        if self.keywords is not None:
+            self.keywords.close()
+
+
+class InMemoryStore:
+    """
+    In-process VectorStore: exact cosine search over a numpy matrix. Suited to small corpora, tests and benchmarks; nothing is persisted.
+    """
+
+    name = "memory"
+    batch_queries = True
+
+    def __init__(self, fields=None, embed_fn=None):
+        self.fields = list(fields or ["hash", "title", "link", "published", "tags", "content"])
+        self.embed_fn = embed_fn
+        self.records = {}
+        self.ids = []
+        self.matrix = None
+        self.lexicon = None
+
+    def embed(self, texts):
+        if self.embed_fn is None:
+            self.embed_fn = default_embedder()
+        return [list(v) for v in self.embed_fn(texts)]
+
+    def upsert(self, records, batch_size=100):
+        for batch in _batches(records, batch_size):
+            missing = [r for r in batch if r.get("vector") is None]
+            vectors = iter(self.embed([r["content"] for r in missing])) if missing else None
+            for record in batch:
+                vector = record.get("vector")
+                if vector is None:
+                    vector = next(vectors)
+                data = {k: v for k, v in record.items() if k in self.fields}
+                published = to_epoch(record.get("published"))
+                if published is not None:
+                    data[PUBLISHED_TS] = published
+                self.records[record["hash"]] = (np.asarray(vector, dtype=np.float32), data)
+        self.matrix = None  # rebuilt lazily on the next query
+        self.lexicon = None
+        return len(records)
+
+    def build_matrix(self):
+        self.ids = list(self.records)
+        if not self.ids:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+            return
+        matrix = np.stack([self.records[i][0] for i in self.ids])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.maximum(norms, 1e-12)
+
+    def matches(self, data, filters):
+        for key, value in (filters or {}).items():
+            stored = data.get(PUBLISHED_TS if key == "published" else key)
+            if isinstance(value, dict):
+                stored = to_epoch(stored)
+                if stored is None:
+                    return False
+                if value.get("gte") is not None and stored < to_epoch(value["gte"]):
+                    return False
+                if value.get("lte") is not None and stored > to_epoch(value["lte"]):
+                    return False
+                continue
+            if key == "tags":
+                stored = {tag.lower() for tag in split_tags(stored)}
+                for group in tag_groups(value):
+                    if not stored & {tag.lower() for tag in group}:
+                        return False
+                continue
+            stored = stored if isinstance(stored, (list, tuple, set)) else [stored]
+            wanted = value if isinstance(value, (list, tuple, set)) else [value]
+            if not set(stored) & set(wanted):
+                return False
+        return True
+
+    def keyword_query(self, texts, k=1, filters=None):
+        if self.lexicon is None:
+            self.lexicon = build_lexicon(
+                {
+                    i: f"{data.get('title', '')} {data.get('content', '')}"
+                    for i, (_, data) in self.records.items()
+                }
+            )
+
+        results = []
+        for text in texts:
+            scores = bm25_scores(text, self.lexicon)
+            ranked = [
+                i
+                for i in sorted(scores, key=scores.get, reverse=True)
+                if self.matches(self.records[i][1], filters)
+            ][:k]
+            results.append(
+                [Hit(id=i, score=scores[i], data=dict(self.records[i][1])) for i in ranked]
+            )
+        return results
+
+    def query(self, vectors=None, k=1, filters=None, texts=None, include_vectors=False):
+        if self.matrix is None:
+            self.build_matrix()
+        queries = list(vectors or []) + (self.embed(texts) if texts else [])
+        if not queries or not self.ids:
+            return [[] for _ in queries]
+
+        q = np.asarray(queries, dtype=np.float32)
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        scores = q @ self.matrix.T
+
+        if filters:
+            mask = np.array(
+                [self.matches(self.records[i][1], filters) for i in self.ids]
+            )
+            scores[:, ~mask] = -np.inf
+
+        results = []
+        for row in scores:
+            top = np.argsort(-row)[:k]
+            hits = []
+            for idx in top:
+                if not np.isfinite(row[idx]):
+                    break
+                vector, data = self.records[self.ids[idx]]
+                hits.append(
+                    Hit(
+                        id=self.ids[idx],
+                        score=float(row[idx]),
+                        data=dict(data),
+                        vector=vector.tolist() if include_vectors else None,
+                    )
+                )
+            results.append(hits)
+        return results
+
+    def vectors(self, ids):
+        return {i: self.records[i][0].tolist() for i in ids if i in self.records}
+
+    def delete(self, ids):
+        for record_id in ids:
+            self.records.pop(record_id, None)
+        self.matrix = None
+        self.lexicon = None
+
+    def is_ready(self):
+        return True
+
+    def close(self):
+        pass
+
+
+STORES = {
+    "weaviate": WeaviateStore,
+    "chroma": ChromaStore,
+    "memory": InMemoryStore,
+}
+
+
+def get_store(database="weaviate", **kwargs):
+    """Creates the VectorStore registered under the given database name."""
+    if database not in STORES:
+        raise KeyError(f"Vector store [{database}] not found")
+    return STORES[database](**kwargs)
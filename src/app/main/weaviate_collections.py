@@ -0,0 +1,116 @@
+import logging
+from datetime import datetime
+import weaviate.classes as wvc
+from weaviate.util import generate_uuid5
+from app.main.vector_store import PUBLISHED_TS, to_epoch
+
+"""
+Helpers for versioned Weaviate collections served through an alias.
+
+The configured dbname (e.g. ArticleEmbeddings) is an alias pointing at a concrete collection named <dbname>_v<timestamp>. Readers and writers only ever use the alias, so a rebuild can load a new version next to the live one and swap the alias once it is complete.
+"""
+
+
+def build_properties(cfg):
+    """Builds the Weaviate property definitions from the config schema."""
+    return [
+        wvc.config.Property(
+            name=field["name"],
+            data_type=wvc.config.DataType(field["dataType"]),
+            skip_vectorization=field["skip"],
+        )
+        for field in cfg["schema"]
+    ]
+
+
+def versioned_name(cfg):
+    """Returns a new timestamped collection name for the configured alias."""
+    return f"{cfg['dbname']}_v{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+
+def create_versioned_collection(client, cfg):
+    """Creates an empty, versioned collection and returns its name."""
+    name = versioned_name(cfg)
+    client.collections.create(
+        name=name,
+        vectorizer_config=wvc.config.Configure.Vectorizer.text2vec_contextionary(),
+        properties=build_properties(cfg),
+    )
+    logging.info(f"Created collection {name}")
+    return name
+
+
+def list_versions(client, cfg):
+    """Lists the versioned collections for the alias (oldest first)."""
+    prefix = f"{cfg['dbname']}_v"
+    names = client.collections.list_all(simple=True).keys()
+    return sorted(name for name in names if name.startswith(prefix))
+
+
+def resolve_alias(client, alias):
+    """
+    Returns the collection an alias points to, or None if the alias does not exist (e.g. a legacy setup where dbname is a concrete collection).
+    """
+    try:
+        found = client.alias.get(alias_name=alias)
+        return found.collection if found else None
+    except Exception as e:
+        logging.debug(f"Alias lookup for {alias} failed: {e}")
+        return None
+
+
+def point_alias(client, alias, target):
+    """
+    Points the alias at the target collection, which must already be loaded. A legacy concrete collection with the alias name is only dropped if it keeps the alias from being created, since the two cannot coexist; it is replaced by the alias right away.
+    """
+    previous = resolve_alias(client, alias)
+    if previous:
+        client.alias.update(alias_name=alias, new_target_collection=target)
+    else:
+        try:
+            client.alias.create(alias_name=alias, target_collection=target)
+        except Exception:
+            if not client.collections.exists(alias):
+                raise
+            logging.warning(f"Dropping legacy collection {alias} to create alias.")
+            client.collections.delete(alias)
+            try:
+                client.alias.create(alias_name=alias, target_collection=target)
+            except Exception:
+                logging.error(
+                    f"Legacy collection {alias} was dropped but the alias could "
+                    f"not be created; point {alias} at {target} manually."
+                )
+                raise
+    logging.info(f"Alias {alias}: {previous} -> {target}")
+    return previous
+
+
+def prune_versions(client, cfg, keep):
+    """Deletes all but the newest `keep` versions that the alias is not using."""
+    current = resolve_alias(client, cfg["dbname"])
+    stale = [name for name in list_versions(client, cfg) if name != current]
+    for name in stale[: max(len(stale) - (keep - 1), 0)]:
+        client.collections.delete(name)
+        logging.info(f"Deleted old collection {name}")
+
+
+def to_properties(data):
+    """Converts a Postgres row dict into JSON-compatible Weaviate properties."""
+    properties = dict(data)
+
+    # Ensure tags is a list
+    if "tags" in properties and isinstance(properties["tags"], str):
+        properties["tags"] = [tag.strip() for tag in properties["tags"].split(",")]
+
+    # Numeric publish time, for recency scoring
+    if properties.get("published") is not None:
+        properties[PUBLISHED_TS] = to_epoch(properties["published"])
+    return properties
+
+
+def object_uuid(article_hash):
+    """
+    Deterministic object UUID from the article hash; re-adding an article overwrites it instead of creating a duplicate.
+    """
+    return generate_uuid5(article_hash)
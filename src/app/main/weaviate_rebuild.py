@@ -0,0 +1,165 @@
+import os
+import sys
+import logging
+import psycopg
+import weaviate
+import subprocess
+from utils.config import config
+from app.main.retrieval_cache import bump_watermark
+from app.main.weaviate_collections import (
+    create_versioned_collection,
+    object_uuid,
+    point_alias,
+    prune_versions,
+    to_properties,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(levelname)s - %(message)s",
+)
+
+
+class WeaviateRebuild:
+    """
+    Blue/green rebuild of the Weaviate vector store. Loads every article from PostgreSQL into a new versioned collection while the alias keeps serving the old one, validates the object count, then swaps the alias over.
+    """
+
+    def __init__(self):
+        self.cfg = config.get_section("weaviate")
+        self.opts = self.cfg["rebuild"]
+        self.fields = list(self.cfg["fields"])
+        self.client = weaviate.connect_to_local(port=self.cfg["port"])
+        self.db_conn = psycopg.connect(**config.get_section("DB_USER"))
+
+    def stream_articles(self, min_id=0, max_id=None):
+        """
+        Streams article rows in id order through a server-side cursor, so the full table is never held in memory.
+        """
+        query = f"SELECT id, {', '.join(self.fields)} FROM articles WHERE id > %s"
+        params = [min_id]
+        if max_id is not None:
+            query += " AND id <= %s"
+            params.append(max_id)
+        query += " ORDER BY id"
+
+        with self.db_conn.cursor(name="weaviate_rebuild") as cur:
+            cur.itersize = self.opts["batch_size"]
+            cur.execute(query, params)
+            for row in cur:
+                yield row[0], dict(zip(self.fields, row[1:]))
+        self.db_conn.commit()
+
+    def count_articles(self, max_id):
+        """Number of articles in PostgreSQL up to and including max_id."""
+        with self.db_conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM articles WHERE id <= %s", (max_id,))
+            count = cur.fetchone()[0]
+        self.db_conn.commit()
+        return count
+
+    def load(self, name, min_id=0, max_id=None):
+        """
+        Bulk-loads articles into the named collection using fixed-size batches sent over several concurrent requests. Returns the number of objects sent and the highest article id seen.
+        """
+        collection = self.client.collections.get(name)
+        sent, last_id = 0, min_id
+
+        with collection.batch.fixed_size(
+            batch_size=self.opts["batch_size"],
+            concurrent_requests=self.opts["concurrent_requests"],
+        ) as batch:
+            for article_id, data in self.stream_articles(min_id, max_id):
+                batch.add_object(
+                    properties=to_properties(data), uuid=object_uuid(data["hash"])
+                )
+                sent += 1
+                last_id = article_id
+
+        failed = collection.batch.failed_objects
+        if failed:
+            raise RuntimeError(f"{len(failed)} objects failed to load into {name}")
+
+        logging.info(f"Loaded {sent} objects into {name}.")
+        return sent, last_id
+
+    def validate(self, name, max_id):
+        """Checks the collection holds exactly one object per article."""
+        expected = self.count_articles(max_id)
+        collection = self.client.collections.get(name)
+        total = collection.aggregate.over_all(total_count=True).total_count
+        if total != expected:
+            logging.error(f"{name} has {total} objects; expected {expected}.")
+            return False
+        logging.info(f"{name} validated with {total} objects.")
+        return True
+
+    def mark_as_embedded(self, max_id):
+        """Marks every article loaded by the rebuild as embedded."""
+        with self.db_conn.cursor() as cur:
+            cur.execute(
+                "UPDATE articles SET embedded = TRUE WHERE id <= %s", (max_id,)
+            )
+        self.db_conn.commit()
+
+    def run(self):
+        """
+        1. Create a new versioned collection.
+        2. Bulk-load it from PostgreSQL (the alias still serves the old one).
+        3. Validate the object count; abort and drop it on mismatch.
+        4. Move the alias to the new collection.
+        5. Catch up on articles ingested (into the old one) during the load.
+        """
+        name = create_versioned_collection(self.client, self.cfg)
+        try:
+            _, max_id = self.load(name)
+            if not self.validate(name, max_id):
+                self.client.collections.delete(name)
+                logging.error(f"Rebuild aborted; {name} deleted.")
+                return False
+
+            point_alias(self.client, self.cfg["dbname"], name)
+
+            # Objects use deterministic UUIDs, so overlaps are overwritten
+            caught_up, max_id = self.load(name, min_id=max_id)
+            logging.info(f"Caught up on {caught_up} articles ingested mid-rebuild.")
+
+            self.mark_as_embedded(max_id)
+
+            # The alias now serves a new collection; drop cached retrievals
+            bump_watermark(f"{name}:{max_id}")
+            prune_versions(self.client, self.cfg, keep=self.opts["keep_versions"])
+            return True
+
+        finally:
+            self.client.close()
+            self.db_conn.close()
+
+
+def start_background_rebuild():
+    """
+    Launches the rebuild as a detached background process. Its output is appended to weaviate.rebuild.log_path, so a failed rebuild can be diagnosed afterwards.
+    """
+    log_path = os.path.join(
+        config.root, config.get_section("weaviate")["rebuild"]["log_path"]
+    )
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "a") as log:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "app.main.weaviate_rebuild"],
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    logging.info(
+        f"Weaviate rebuild started in the background (PID {process.pid}); "
+        f"logging to {log_path}."
+    )
+    return process
+
+
+if __name__ == "__main__":
+    if "--background" in sys.argv[1:]:
+        start_background_rebuild()
+    else:
+        WeaviateRebuild().run()
@@ -1,50 +1,217 @@
+import httpx
 import ollama
+import random
+import asyncio
 import logging
-from openai import OpenAI
+import functools
+from openai import OpenAI, AsyncOpenAI, APIConnectionError
+from utils.llm_cache import llm_cache
+from utils.llm_metrics import llm_metrics
+from features.multi_agent.config import Configuration
 
+LOCAL_MODEL = "granite3.2:2b-instruct-q4_K_M"
+OPENAI_MODEL = "gpt-4o-mini-2024-07-18"
 
-def call_local_llm(messages):
+
+class ClientPool:
     """
-    Sends a list of messages (role + content) to the local LLM and returns its response as a string. Wraps Ollama's API call.
+    Async LLM clients shared by every agent in the process, so several company pipelines can run concurrently without blocking the event loop. Holds one AsyncOpenAI client (per API key) and one ollama.AsyncClient per event loop, since their connection pools are bound to the loop that created them. Requests are capped at LLM_MAX_CONCURRENCY per backend, time out after LLM_TIMEOUT seconds and are retried on transient errors with jittered exponential backoff.
     """
+
+    def __init__(self, cfg=None):
+        self.cfg = cfg or Configuration()
+        self.loops = {}  # event loop -> {"limits": ..., "ollama": ..., "openai": {}}
+
+    def clients(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.loops:
+            # Drop clients of loops that are gone (e.g. earlier asyncio.run calls)
+            self.loops = {k: v for k, v in self.loops.items() if not k.is_closed()}
+            limit = self.cfg.LLM_MAX_CONCURRENCY
+            self.loops[loop] = {
+                "limits": {
+                    "ollama": asyncio.Semaphore(limit),
+                    "openai": asyncio.Semaphore(limit),
+                },
+                "ollama": ollama.AsyncClient(
+                    timeout=self.cfg.LLM_TIMEOUT,
+                    limits=httpx.Limits(max_connections=limit),
+                ),
+                "openai": {},
+            }
+        return self.loops[loop]
+
+    def ollama_client(self):
+        return self.clients()["ollama"]
+
+    def openai_client(self, api_key):
+        clients = self.clients()["openai"]
+        if api_key not in clients:
+            clients[api_key] = AsyncOpenAI(
+                api_key=api_key,
+                timeout=self.cfg.LLM_TIMEOUT,
+                max_retries=0,  # retried by request()
+            )
+        return clients[api_key]
+
+    async def request(self, backend, call, record=None):
+        """
+        Awaits call() under the backend's concurrency limit, retrying transient failures. Other errors (and the last transient one) are raised. record (an LLMCall) is marked sent once a slot is free.
+        """
+        limit = self.clients()["limits"][backend]
+        retries = self.cfg.LLM_MAX_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                async with limit:
+                    if record is not None:
+                        record.send()
+                    return await asyncio.wait_for(call(), self.cfg.LLM_TIMEOUT)
+            except Exception as e:
+                if attempt == retries or not transient(e):
+                    raise
+                delay = random.uniform(0, 0.5 * 2**attempt)  # full jitter
+                logging.warning(f"{backend} request failed ({e}); retrying.")
+                await asyncio.sleep(delay)
+
+
+def transient(error):
+    """Whether a failed LLM request is worth retrying (rate limits, overload, network)."""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return isinstance(
+        error, (APIConnectionError, httpx.TransportError, asyncio.TimeoutError)
+    )
+
+
+def call_local_llm(messages, use_cache=True, site="call_local_llm"):
+    """
+    Sends a list of messages (role + content) to the local LLM and returns its response as a string. Wraps Ollama's API call; repeated requests come from the LLM response cache unless use_cache is False.
+    """
+    key = llm_cache.make_key("ollama", LOCAL_MODEL, messages)
+    cached = llm_cache.get(key) if use_cache else None
+    if cached is not None:
+        return cached
+    try:
+        with llm_metrics.call(site, "ollama", LOCAL_MODEL) as call:
+            response = ollama.chat(
+                model=LOCAL_MODEL,
+                messages=messages,
+                stream=False,
+                options={"keep_alive": "5m"},
+            )
+            call.ollama(response)
+        content = response["message"]["content"].strip()
+    except Exception as e:
+        logging.error(f"LLM request failed: {e}")
+        return f"LLM Error: {str(e)}"
+    if use_cache:
+        llm_cache.put(key, content, model=LOCAL_MODEL)
+    return content
+
+
+async def acall_local_llm(messages, use_cache=True, site="acall_local_llm"):
+    """Async version of call_local_llm, using the shared client pool."""
+    key = llm_cache.make_key("ollama", LOCAL_MODEL, messages)
+    cached = llm_cache.get(key) if use_cache else None
+    if cached is not None:
+        return cached
     try:
-        response = ollama.chat(
-            model="granite3.2:2b-instruct-q4_K_M",
-            messages=messages,
-            stream=False,
-            options={"keep_alive": "5m"},
-        )
-        return response["message"]["content"].strip()
+        with llm_metrics.call(site, "ollama", LOCAL_MODEL) as call:
+            response = await client_pool.request(
+                "ollama",
+                lambda: client_pool.ollama_client().chat(
+                    model=LOCAL_MODEL,
+                    messages=messages,
+                    stream=False,
+                    options={"keep_alive": "5m"},
+                ),
+                call,
+            )
+            call.ollama(response)
+        content = response["message"]["content"].strip()
     except Exception as e:
         logging.error(f"LLM request failed: {e}")
         return f"LLM Error: {str(e)}"
+    if use_cache:
+        llm_cache.put(key, content, model=LOCAL_MODEL)
+    return content
 
 
-def call_llm(api_key, messages, schema=False):
+def call_llm(api_key, messages, schema=False, use_cache=True, site="call_llm"):
     """
-    Sends a list of messages (role + content) to ChatGPT.
+    Sends a list of messages (role + content) to ChatGPT. Repeated requests come from the LLM response cache unless use_cache is False.
     """
-    client = OpenAI(api_key=api_key)
+    key = llm_cache.make_key("openai", OPENAI_MODEL, messages, {"schema": schema})
+    cached = llm_cache.get(key, backend="openai") if use_cache else None
+    if cached is not None:
+        return cached
+
     try:
-        if schema:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini-2024-07-18",
-                messages=messages,
-                response_format=schema,
+        with llm_metrics.call(site, "openai", OPENAI_MODEL) as call:
+            response = openai_client(api_key).chat.completions.create(
+                **openai_request(OPENAI_MODEL, messages, schema)
             )
-            content = response.choices[0].message.content
-            logging.debug(f"ChatGPT structured response: {content}")
-            logging.debug(f"Token usage: {response.usage.total_tokens}")
-            return content
-        else:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini-2024-07-18", messages=messages
-            )
-            content = response.choices[0].message.content
-            logging.debug(f"ChatGPT unstructured response: {content}")
-            logging.debug(f"Token usage: {response.usage.total_tokens}")
-            return content
+            call.openai(response)
+        content = openai_content(response, schema)
+    except Exception as e:
+        logging.error(f"ChatGPT request failed: {e}")
+        return f"ChatGPT Error: {str(e)}"
+    if use_cache and content:
+        llm_cache.put(key, content, backend="openai", model=OPENAI_MODEL)
+    return content
+
+
+async def acall_llm(api_key, messages, schema=False, use_cache=True, site="acall_llm"):
+    """
+    Async version of call_llm, for the agents: awaits the request on the shared client pool instead of blocking the event loop.
+    """
+    key = llm_cache.make_key("openai", OPENAI_MODEL, messages, {"schema": schema})
+    cached = llm_cache.get(key, backend="openai") if use_cache else None
+    if cached is not None:
+        return cached
 
+    try:
+        with llm_metrics.call(site, "openai", OPENAI_MODEL) as call:
+            response = await client_pool.request(
+                "openai",
+                lambda: client_pool.openai_client(api_key).chat.completions.create(
+                    **openai_request(OPENAI_MODEL, messages, schema)
+                ),
+                call,
+            )
+            call.openai(response)
+        content = openai_content(response, schema)
     except Exception as e:
         logging.error(f"ChatGPT request failed: {e}")
         return f"ChatGPT Error: {str(e)}"
+    if use_cache and content:
+        llm_cache.put(key, content, backend="openai", model=OPENAI_MODEL)
+    return content
+
+
+@functools.lru_cache(maxsize=None)
+def openai_client(api_key):
+    """Blocking OpenAI client, one per API key, reused across calls."""
+    cfg = Configuration()
+    return OpenAI(
+        api_key=api_key, timeout=cfg.LLM_TIMEOUT, max_retries=cfg.LLM_MAX_RETRIES
+    )
+
+
+def openai_request(model, messages, schema=False):
+    request = {"model": model, "messages": messages}
+    if schema:
+        request["response_format"] = schema
+    return request
+
+
+def openai_content(response, schema=False):
+    content = response.choices[0].message.content
+    kind = "structured" if schema else "unstructured"
+    logging.debug(f"ChatGPT {kind} response: {content}")
+    return content
+
+
+# Create a global instance to be imported anywhere
+client_pool = ClientPool()
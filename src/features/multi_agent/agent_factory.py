@@ -5,8 +5,8 @@ import logging
 
 from openai import OpenAI
 from tavily import AsyncTavilyClient
-from app.main.embedding_search import EmbeddingSearch
-from features.multi_agent.LLM import call_llm
+from app.main.search_service import get_search_service
+from features.multi_agent.LLM import acall_llm
 from features.multi_agent.utility import filter_searches, format_results
 from features.multi_agent.config import Configuration
 from features.multi_agent.state import OverallState
@@ -43,7 +43,7 @@ async def run_research_pipeline(company: str) -> OverallState:
         await agent_compile_research(state)  # Compile research from stored data
     else:
         # Step 2: Generate queries
-        agent_generate_queries(state)
+        await agent_generate_queries(state)
 
         # Step 3: Tavily web search
         await agent_web_search(state)
@@ -52,7 +52,7 @@ async def run_research_pipeline(company: str) -> OverallState:
         await agent_compile_research(state)
 
     # Step 5: Extract structured JSON from the compiled research
-    agent_extract_schema(state)
+    await agent_extract_schema(state)
 
     # state.final_output should have the final JSON output
     return state
@@ -62,8 +62,13 @@ async def agent_check_database(state: OverallState) -> bool:
     """
     Step 1: Checks if relevant data exists in database. If so, stores in state.search_results.
     """
-    vector_search = EmbeddingSearch(state.company)
-    metadata, docs = vector_search.run()
+    # Narrow to the company's articles when the company index knows it;
+    # the lookups block, so they run off the event loop
+    search = get_search_service()
+    filters = await asyncio.to_thread(search.build_filters, company=state.company)
+    metadata, docs = await asyncio.to_thread(
+        search.retrieve, state.company, filters=filters
+    )
 
     if not metadata:
         logging.info("No stored data; initiating web search.")
@@ -82,7 +87,7 @@ async def agent_check_database(state: OverallState) -> bool:
     return True
 
 
-def agent_generate_queries(state: OverallState) -> None:
+async def agent_generate_queries(state: OverallState) -> None:
     """
     Step 2: Generates relevant search queries based on the company's name and schema. Stores the resulting list of queries in state.search_queries.
     """
@@ -98,7 +103,9 @@ def agent_generate_queries(state: OverallState) -> None:
             "content": QUERY_LIST_PROMPT.format(N_searches=cfg.N_searches),
         },
     ]
-    output = call_llm(cfg.OPENAI_API_KEY, messages)
+    output = await acall_llm(
+        cfg.OPENAI_API_KEY, messages, site="agent_generate_queries"
+    )
     search_queries = re.findall(r'"\s*(.*?)\s*"', output)  # remove enumeration
     state.search_queries = search_queries
     logging.info(f"Generated search queries: {state.search_queries}")
@@ -110,7 +117,7 @@ async def agent_web_search(state: OverallState) -> None:
     """
     if not state.search_queries:
         logging.warning("No search queries were found; regenerating queries.")
-        agent_generate_queries(state)
+        await agent_generate_queries(state)
 
     tasks = []
     for query in state.search_queries:
@@ -136,14 +143,16 @@ async def agent_compile_research(state: OverallState) -> None:
         schema=state.output_schema,
         context=context_str,
     )
-    research_notes = call_llm(
-        cfg.OPENAI_API_KEY, messages=[{"role": "user", "content": instructions}]
+    research_notes = await acall_llm(
+        cfg.OPENAI_API_KEY,
+        messages=[{"role": "user", "content": instructions}],
+        site="agent_compile_research",
     )
     state.research.append(research_notes)
     logging.info("Compiled research notes added to state.research.")
 
 
-def agent_extract_schema(state: OverallState) -> None:
+async def agent_extract_schema(state: OverallState) -> None:
     """
     Step 5: Takes the compiled research (state.research) and prompts the LLM
     to output JSON that strictly matches the schema in state.output_schema.
@@ -157,10 +166,11 @@ def agent_extract_schema(state: OverallState) -> None:
         schema=state.output_schema,
         research=state.research,
     )
-    output = call_llm(
+    output = await acall_llm(
         cfg.OPENAI_API_KEY,
         messages=[{"role": "user", "content": instructions}],
         schema=state.output_schema,
+        site="agent_extract_schema",
     )
 
     try:
@@ -1,6 +1,7 @@
+import asyncio
 from ..base_agent import BaseAgent
 from ..events import Event, EventType
-from app.main.embedding_search import EmbeddingSearch
+from app.main.search_service import get_search_service
 
 
 class DatabaseAgent(BaseAgent):
@@ -22,8 +23,15 @@ class DatabaseAgent(BaseAgent):
     async def check_database(self, event_queue) -> None:
         self.log("Checking the database...")
 
-        vector_search = EmbeddingSearch(self.state.company)
-        metadata, docs = vector_search.run()
+        # Narrow to the company's articles when the company index knows it;
+        # the lookups block, so they run off the event loop
+        search = get_search_service()
+        filters = await asyncio.to_thread(
+            search.build_filters, company=self.state.company
+        )
+        metadata, docs = await asyncio.to_thread(
+            search.retrieve, self.state.company, filters=filters
+        )
 
         if not metadata:
             self.log("No stored data found; publishing NEED_QUERIES.")
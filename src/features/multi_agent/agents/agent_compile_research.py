@@ -1,4 +1,4 @@
-from features.multi_agent.LLM import call_llm
+from features.multi_agent.LLM import acall_llm
 
 from ..config import Configuration
 from ..base_agent import BaseAgent
@@ -32,8 +32,10 @@ class ResearchAgent(BaseAgent):
             context=context_str,
         )
 
-        research_notes = call_llm(
-            cfg.OPENAI_API_KEY, messages=[{"role": "user", "content": instructions}]
+        research_notes = await acall_llm(
+            cfg.OPENAI_API_KEY,
+            messages=[{"role": "user", "content": instructions}],
+            site=self.name,
         )
         self.state.research.append(research_notes)
         self.log("Reesearch notes completed.")
@@ -1,6 +1,6 @@
 import json
 import logging
-from features.multi_agent.LLM import call_llm
+from features.multi_agent.LLM import acall_llm
 
 from ..config import Configuration
 from ..base_agent import BaseAgent
@@ -35,10 +35,11 @@ class ExtractionAgent(BaseAgent):
             schema=self.state.output_schema, research=self.state.research
         )
 
-        output = call_llm(
+        output = await acall_llm(
             cfg.OPENAI_API_KEY,
             messages=[{"role": "user", "content": instructions}],
             schema=self.state.output_schema,
+            site=self.name,
         )
         try:
             data = json.loads(output)
@@ -1,6 +1,6 @@
 import re
 import json
-from features.multi_agent.LLM import call_llm
+from features.multi_agent.LLM import acall_llm
 
 from ..config import Configuration
 from ..base_agent import BaseAgent
@@ -42,7 +42,7 @@ class QueryGenerationAgent(BaseAgent):
                 "content": QUERY_LIST_PROMPT.format(N_searches=cfg.N_searches),
             },
         ]
-        output = call_llm(cfg.OPENAI_API_KEY, messages)
+        output = await acall_llm(cfg.OPENAI_API_KEY, messages, site=self.name)
 
         search_queries = re.findall(r'"\s*(.*?)\s*"', output)  # clean if needed
         self.state.search_queries = search_queries
@@ -1,6 +1,7 @@
 import asyncio
 from tavily import AsyncTavilyClient
 from features.multi_agent.utility import filter_searches
+from app.main.company_index import add_to_gazetteer
 
 from ..base_agent import BaseAgent
 from ..config import Configuration
@@ -43,5 +44,8 @@ class WebSearchAgent(BaseAgent):
         unique_results = filter_searches(search_results)  # filter duplicates
         self.state.search_results = unique_results
 
+        # Index future articles about this company
+        await asyncio.to_thread(add_to_gazetteer, [self.state.company], "tavily")
+
         self.log("Publishing SEARCH_RESULTS_READY.")
         await event_queue.put(Event(EventType.SEARCH_RESULTS_READY))
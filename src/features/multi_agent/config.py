@@ -19,6 +19,12 @@ class Configuration:
     # Number of revisions to the final output
     N_revisions: int = 0
 
+    # Shared LLM clients: concurrent requests per backend, seconds per request
+    # and retries on transient errors (rate limits, overload, network)
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TIMEOUT: float = 120.0
+    LLM_MAX_RETRIES: int = 3
+
     TAVILY_SEARCH_PARAMS = {
         "search_depth": "basic",
         "max_results": 3,
@@ -1,28 +1,27 @@
 import json
-import ollama
 import logging
 from utils.config import ConfigLoader
+from app.main.local_LLM import LocalLLM
 from features.multi_agent.arango_pipeline import GraphDBHandler
 
 
 class StructureData:
     def __init__(self):
         cfg = ConfigLoader("llmConfig")
-        self.model = cfg.get_section("models")["granite-instruct"]
+        # Routed like other LLM calls (routing.tasks.extraction), preferring granite
+        self.LLM = LocalLLM("granite-instruct")
         self.template = cfg.get_value("instruct_prompt")
         self.graph_handler = GraphDBHandler()
 
-    def call_llm(self, company, context):
+    def call_llm(self, company, context, use_cache=True):
         prompt = self.template.format(company=company, context=context)
-        response = ollama.chat(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            stream=False,
-            options={"keep_alive": "1m"},
+        messages = [{"role": "user", "content": prompt}]
+        response = self.LLM.call_llm(
+            messages, use_cache, task="extraction", site="StructureData"
         )
         logging.info("Structured data generated.")
-        logging.debug(f"LLM response:\n{response['message']['content']}")
-        return response["message"]["content"]
+        logging.debug(f"LLM response:\n{response}")
+        return response
 
     def graph_storage(self, data):
         try:
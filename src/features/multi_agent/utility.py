@@ -1,4 +1,5 @@
 import logging
+from utils.tokens import token_counter
 
 
 def filter_searches(results: dict | list[dict]) -> list[dict]:
@@ -54,11 +55,9 @@ def format_results(sources: list[dict], max_tokens: int = 1000) -> str:
             raw_content = ""
             logging.warning(f"No raw_content found for source {source['url']}")
 
-        # 1 token ~ 4 characters
-        char_limit = max_tokens * 4
-
-        if len(raw_content) > char_limit:
-            raw_content = raw_content[:char_limit] + "... [truncated]"
+        truncated = token_counter.truncate(raw_content, max_tokens)
+        if len(truncated) < len(raw_content):
+            raw_content = truncated + "... [truncated]"
         formatted_text += (
             f"Full source content limited to {max_tokens} tokens: {raw_content}\n\n"
         )
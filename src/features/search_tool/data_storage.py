@@ -2,6 +2,8 @@ import logging
 import psycopg
 from utils.config import config
 from utils.helpers import store_to_postgres
+from app.main.company_index import CompanyIndex
+from app.main.chunk_summaries import ChunkSummaries
 from app.main.weaviate_embeddings import GenerateEmbeddings
 
 logging.basicConfig(
@@ -29,5 +31,11 @@ def store_data(articles):
         embeddings = GenerateEmbeddings(db_conn=conn)
         embeddings.check_postgres()
 
+        # Update the company -> article postings
+        CompanyIndex(db_conn=conn).run()
+
+        # Precompute chunk summaries of long articles (if chunk_summaries.at_ingest)
+        ChunkSummaries(db_conn=conn).ingest()
+
     finally:
         conn.close()
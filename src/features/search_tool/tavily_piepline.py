@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 from tavily import AsyncTavilyClient
 from utils.config import ConfigLoader
 from app.main.local_LLM import LocalLLM
+from app.main.company_index import add_to_gazetteer
 from features.search_tool.firecrawl_extract import FirecrawlScraper
 
 
@@ -54,12 +55,15 @@ class TavilySearch:
 
     async def run_search(self, company):
         """
-        1. Get products & competitors in parallel.
+        1. Get products & competitors in parallel (and record the company).
         2. Start Firecrawl extraction in the background.
         3. Return results immediately so UI can display them without waiting.
         """
-        products, competitors = await asyncio.gather(
-            self.get_products(company), self.get_competitors(company)
+        # Also adds the company to the gazetteer of the company index
+        products, competitors, _ = await asyncio.gather(
+            self.get_products(company),
+            self.get_competitors(company),
+            asyncio.to_thread(add_to_gazetteer, [company], "tavily"),
         )
 
         # Start Firecrawl as a background process
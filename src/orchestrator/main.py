@@ -14,11 +14,32 @@ Key Features:
 - Local LLM for refining response
 """
 
+import copy
+import json
+import time
+import asyncio
+import functools
 import logging
-from fastapi import FastAPI, Query
+import threading
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.config import config
+from utils.helpers import generate_hash
+from utils.metrics import metrics, stage_timer
+from utils.llm_metrics import llm_metrics
+from utils.tokens import token_counter
 from app.main.local_LLM import LocalLLM
+from app.main.semantic_cache import SemanticCache
+from app.main.extractive_qa import ExtractiveQA
+from app.main.chunk_summaries import ChunkSummaries
+from app.main.session_store import get_session_store
 from fastapi.middleware.cors import CORSMiddleware
-from app.main.embedding_search import EmbeddingSearch
+from app.main.retrieval_cache import normalize_query
+from app.main.search_service import get_search_service, close_search_services
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,58 +50,222 @@ logging.basicConfig(
 class CIA:
     def __init__(self):
         self.LLM = LocalLLM()
-        self.cache = {}
         self.database = "weaviate"
 
-    def engine(self, query: str, category: str = None, session_id: str = None):
+        # Shared, long-lived vector store clients (see startup below)
+        self.search = get_search_service(self.database)
+
+        # Answers for recent near-duplicate questions (None if disabled)
+        cfg = config.get_section("semantic_cache")
+        self.answers = (
+            SemanticCache(cfg["threshold"], cfg["max_entries"], cfg["ttl"])
+            if cfg["enabled"]
+            else None
+        )
+
+        # Answers factoid questions without the LLM (if enabled)
+        self.extractor = ExtractiveQA()
+
+        # Conversations and their articles, by session_id
+        self.sessions = get_session_store()
+
+        # Ingest-time chunk summaries, opened on the first long follow-up
+        self.summaries = None
+        self.summaries_lock = threading.Lock()
+
+    def session_llm(self, session=None):
+        """
+        The LLM as one request sees it: it shares the model and its settings, but carries the session's own conversation memory. A query without a session starts a new conversation. Concurrent requests therefore never share a history.
+        """
+        llm = copy.copy(self.LLM)
+        llm.memory = llm.new_memory()
+        if session is not None:
+            llm.memory.load(session["conversation"])
+        return llm
+
+    def lookup_answer(self, query, hits, llm):
+        """
+        Returns a recent answer to a paraphrase of the query built from the same articles (and records it in the session history), or None. Also returns the query embedding for store_answer().
+        """
+        if self.answers is None:
+            return None, None
+
+        vector = self.answers.embed(query)
+        llm_response = self.answers.lookup(vector, [hit.id for hit in hits])
+        if llm_response is not None:
+            # Keep the session history consistent with a generated answer
+            llm.remember(query, llm_response)
+        return llm_response, vector
+
+    def store_answer(self, query, vector, hits, llm_response, llm):
+        """Caches a new answer, unless the LLM call behind it failed."""
+        if self.answers is not None and not llm.memory.failed:
+            self.answers.store(query, vector, [hit.id for hit in hits], llm_response)
+
+    def extract_answer(self, query, hits):
+        """
+        Returns the extractive fast-path answer (span and source) to a factoid question, or None if the LLM should answer it.
+        """
+        result = self.extractor.answer(query, hits)
+        if result is None:
+            return None
+        logging.info(f"Extractive answer (score {result['score']}); skipping the LLM.")
+        return self.extractor.format(result)
+
+    def answer(self, query, hits, LLM_context, llm):
+        """
+        Answers a new query from the semantic cache when a paraphrase was answered recently from the same articles, then from the extractive fast path for confident factoid answers; otherwise calls the LLM.
+        """
+        llm_response, vector = self.lookup_answer(query, hits, llm)
+        if llm_response is None:
+            llm_response = self.extract_answer(query, hits)
+            if llm_response is not None:
+                llm.remember(query, llm_response)
+        if llm_response is None:
+            llm_response = llm.generate(query, LLM_context)
+            self.store_answer(query, vector, hits, llm_response, llm)
+        return llm_response
+
+    def retrieve(
+        self,
+        query,
+        category=None,
+        tags=None,
+        since=None,
+        until=None,
+        mode=None,
+        rerank=None,
+        recency=None,
+        company=None,
+        timings=None,
+    ):
+        """Filtered multi-document retrieval sized to the LLM's context budget."""
+        logging.info("Retrieving RAG data...")
+        filters = self.search.build_filters(category, tags, since, until, company)
+        return self.search.retrieve_context(
+            query,
+            self.LLM.context_budget(),
+            filters=filters,
+            mode=mode,
+            rerank=rerank,
+            recency=recency,
+            timings=timings,
+        )
+
+    def save_session(self, session_id, llm, session=None, retrieved_data=None):
+        """
+        Stores the chat history. A new session also stores its full article, which the store keeps once per article hash.
+        """
+        if not session_id:
+            return
+        if session is not None:
+            article_hash, article = session["article_hash"], None
+        elif retrieved_data:
+            article = retrieved_data["content"]
+            article_hash = retrieved_data.get("hash") or generate_hash(article)
+        else:
+            return
+        self.sessions.save(session_id, llm.memory.to_dict(), article_hash, article)
+
+    def resume_session(self, session_id):
+        """
+        Returns a stored session with its full article ("article"), or None if there is no such session, it expired, or its article is gone.
+        """
+        if not session_id:
+            return None
+        session = self.sessions.load(session_id)
+        if session is None:
+            return None
+        article = self.sessions.article(session["article_hash"])
+        if article is None:
+            return None
+        logging.info(f"Follow-up query, Session ID: {session_id}")
+        return {**session, "article": article}
+
+    def stored_summaries(self, session, context):
+        """
+        Ingest-time chunk summaries of the session's article, so a follow-up on a long article only runs the final reduce. None if the article is short, was not summarized, or PostgreSQL is unavailable.
+        """
+        article_hash = session.get("article_hash")
+        long_article = self.LLM.tokens(context) > self.LLM.chunk_size(None)
+        if not article_hash or not long_article:
+            return None
+        try:
+            with self.summaries_lock:
+                if self.summaries is None:
+                    self.summaries = ChunkSummaries(llm=self.LLM)
+                return self.summaries.get(article_hash)
+        except Exception as e:
+            logging.error(f"Chunk summary lookup failed: {e}")
+            return None
+
+    def close(self):
+        close_search_services()
+        self.extractor.close()
+        self.sessions.close()
+        if self.summaries is not None:
+            self.summaries.close()
+
+    def engine(
+        self,
+        query: str,
+        category: str = None,
+        session_id: str = None,
+        tags: list[str] = None,
+        since: str = None,
+        until: str = None,
+        mode: str = None,
+        rerank: bool = None,
+        recency: float = None,
+        company: str = None,
+    ):
         """Handles queries, info retrieval, LLM refinement, follow-ups."""
+        timings = {}
 
         # Identify if new session or following up a previous session
-        follow_up = session_id in self.cache
+        session = self.resume_session(session_id)
+        follow_up = session is not None
+        llm = self.session_llm(session)
 
         # Directly do a similarity search if not a follow-up query
         if not follow_up:
-            logging.info("Retrieving RAG data...")
-            vector_search = EmbeddingSearch(query, database=self.database)
-            retrieved_data, LLM_context = vector_search.run()
+            retrieved_data, LLM_context, hits = self.retrieve(
+                query,
+                category,
+                tags,
+                since,
+                until,
+                mode,
+                rerank,
+                recency,
+                company,
+                timings,
+            )
 
             # Generate refined response using Local LLM (single-turn)
             logging.info("Generating response...")
-            llm_response = self.LLM.generate(query, LLM_context)
-
-            # Store chat history AND* the full article (*once per session)
-            if session_id:
-                if session_id not in self.cache:
-                    self.cache[session_id] = {
-                        "conversation": self.LLM.conversation_history,
-                        "full_article": retrieved_data["content"],
-                    }
-                else:
-                    self.cache[session_id]["conversation"] = (
-                        self.LLM.conversation_history
-                    )
+            with stage_timer("generate", timings):
+                llm_response = self.answer(query, hits, LLM_context, llm)
+            self.save_session(session_id, llm, retrieved_data=retrieved_data)
 
         else:
-            logging.info(f"Follow-up query: {query}, Session ID: {session_id}")
-
-            self.LLM.conversation_history = self.cache[session_id]["conversation"]
-
-            # Retrieve full article from cache if available
-            logging.info("Retrieving full-article content from cache")
-            context = self.cache[session_id].get("full_article", "")
+            context = session["article"]
+            summaries = self.stored_summaries(session, context)
 
             # Generate response using conversation history (multi-turn)
             logging.info("Generating the follow-up response...")
-            llm_response = self.LLM.generate(
-                query,
-                context=context,
-                prompt_format="follow_up",
-                multi_turn=True,
-            )
+            with stage_timer("generate", timings):
+                llm_response = llm.generate(
+                    query,
+                    context=context,
+                    prompt_format="follow_up",
+                    multi_turn=True,
+                    summaries=summaries,
+                )
 
             # Update conversation history
             logging.info("Updating the conversation history")
-            self.cache[session_id]["conversation"] = self.LLM.conversation_history
+            self.save_session(session_id, llm, session)
 
         return {
             "query": query,
@@ -88,13 +273,222 @@ class CIA:
             "results": retrieved_data if not follow_up else [],
             "llm_response": llm_response,
             "session_id": session_id,
+            "timings": timings,
         }
 
+    async def engine_stream(
+        self,
+        query: str,
+        category: str = None,
+        session_id: str = None,
+        tags: list[str] = None,
+        since: str = None,
+        until: str = None,
+        mode: str = None,
+        rerank: bool = None,
+        recency: float = None,
+        company: str = None,
+    ):
+        """
+        Streaming variant of engine(). Yields (event, data) pairs: "metadata" with the retrieved results as soon as retrieval finishes, then a "token" per generated text delta, then "done" with the full response and stage timings.
+        """
+        timings = {}
+        session = await run_in_threadpool(self.resume_session, session_id)
+        follow_up = session is not None
+        llm = self.session_llm(session)
+        parts = []
+
+        if not follow_up:
+            retrieved_data, LLM_context, hits = await run_in_threadpool(
+                self.retrieve,
+                query,
+                category,
+                tags,
+                since,
+                until,
+                mode,
+                rerank,
+                recency,
+                company,
+                timings,
+            )
+            yield "metadata", {
+                "query": query,
+                "category": category,
+                "results": retrieved_data,
+                "session_id": session_id,
+            }
+
+            with stage_timer("generate", timings):
+                cached, vector = await run_in_threadpool(
+                    self.lookup_answer, query, hits, llm
+                )
+                if cached is None:
+                    cached = await run_in_threadpool(self.extract_answer, query, hits)
+                    if cached is not None:
+                        await run_in_threadpool(llm.remember, query, cached)
+                if cached is not None:
+                    parts.append(cached)
+                    yield "token", cached
+                else:
+                    async for delta in llm.agenerate_stream(query, LLM_context):
+                        parts.append(delta)
+                        yield "token", delta
+                    await run_in_threadpool(
+                        self.store_answer,
+                        query,
+                        vector,
+                        hits,
+                        "".join(parts).strip(),
+                        llm,
+                    )
+            await run_in_threadpool(
+                self.save_session, session_id, llm, None, retrieved_data
+            )
+
+        else:
+            context = session["article"]
+            summaries = await run_in_threadpool(
+                self.stored_summaries, session, context
+            )
+            yield "metadata", {
+                "query": query,
+                "category": category,
+                "results": [],
+                "session_id": session_id,
+            }
+
+            with stage_timer("generate", timings):
+                async for delta in llm.agenerate_stream(
+                    query,
+                    context,
+                    prompt_format="follow_up",
+                    multi_turn=True,
+                    summaries=summaries,
+                ):
+                    parts.append(delta)
+                    yield "token", delta
+            await run_in_threadpool(self.save_session, session_id, llm, session)
+
+        yield "done", {"llm_response": "".join(parts).strip(), "timings": timings}
+
+    def engine_batch(
+        self,
+        queries: list[str],
+        category: str = None,
+        tags: list[str] = None,
+        since: str = None,
+        until: str = None,
+        mode: str = None,
+        rerank: bool = None,
+        recency: float = None,
+        company: str = None,
+        slot=nullcontext,
+    ):
+        """
+        Answers a list of independent (single-turn) questions. All queries are searched together, repeated questions are answered once, and LLM generations run with bounded concurrency, each inside slot() (e.g. holding an engine slot). Yields one result per query as it completes, tagged with its index in the input list. Generations not yet started are cancelled if the caller stops iterating.
+        """
+        settings = config.get_section("batch")
+        if len(queries) > settings["max_queries"]:
+            raise ValueError(f"At most {settings['max_queries']} queries per batch")
+
+        filters = self.search.build_filters(category, tags, since, until, company)
+        budget = self.LLM.context_budget()
+        with stage_timer("batch_retrieve"):
+            candidates = self.search.search_many(
+                queries,
+                k=self.search.candidate_count(rerank),
+                filters=filters,
+                mode=mode,
+                include_vectors=True,
+            )
+
+        # Questions that normalize to the same text share one answer
+        groups = {}
+        for i, query in enumerate(queries):
+            groups.setdefault(normalize_query(query), []).append(i)
+
+        def answer_one(i):
+            query, timings = queries[i], {}
+            retrieved_data, LLM_context, hits = self.search.select_context(
+                query, candidates[i], budget, rerank, recency, timings
+            )
+            with slot(), stage_timer("generate", timings):
+                llm_response = self.extract_answer(query, hits)
+                if llm_response is None:
+                    # Its own view of the LLM, so no answer pins the shared one
+                    _, llm_response = self.session_llm().complete(query, LLM_context)
+            return retrieved_data, llm_response, timings
+
+        pool = ThreadPoolExecutor(max_workers=settings["concurrency"])
+        try:
+            futures = {
+                pool.submit(answer_one, indices[0]): indices
+                for indices in groups.values()
+            }
+            for future in as_completed(futures):
+                try:
+                    retrieved_data, llm_response, timings = future.result()
+                    error = None
+                except Exception as e:
+                    logging.error(f"Batch query failed: {e}")
+                    retrieved_data, llm_response, timings = None, None, {}
+                    error = str(e)
+
+                for i in futures[future]:
+                    yield {
+                        "index": i,
+                        "query": queries[i],
+                        "category": category,
+                        "results": retrieved_data,
+                        "llm_response": llm_response,
+                        "timings": timings,
+                        "error": error,
+                    }
+        finally:
+            # A client that disconnects doesn't wait for the queued generations
+            pool.shutdown(wait=False, cancel_futures=True)
+
 
 # FastAPI initialization
 app = FastAPI()
 agent = CIA()
 
+# /engine and /engine/stream run the blocking pipeline in worker threads, at most
+# this many requests at once; further requests wait without holding up the loop
+engine_slots = asyncio.Semaphore(config.get_section("server")["engine_workers"])
+
+
+async def take_engine_slot():
+    """Waits for a free engine slot; the wait is recorded as engine_queue_seconds."""
+    waited = time.perf_counter()
+    await engine_slots.acquire()
+    metrics.observe("engine_queue_seconds", time.perf_counter() - waited)
+
+
+@asynccontextmanager
+async def engine_slot():
+    await take_engine_slot()
+    try:
+        yield
+    finally:
+        engine_slots.release()
+
+
+@app.on_event("startup")
+def startup():
+    """Opens the vector store client and loads the models once, before the first query."""
+    token_counter.warm_up()
+    agent.search.warm_up()
+    if agent.extractor.enabled:
+        agent.extractor.warm_up()
+
+
+@app.on_event("shutdown")
+def shutdown():
+    agent.close()
+
+
 # Enable CORS for frontend communication
 app.add_middleware(
     CORSMiddleware,
@@ -110,11 +504,135 @@ async def engine(
     q: str = Query(..., description="Search query"),
     category: str = None,
     session_id: str = None,
+    tags: list[str] = Query(None, description="Only articles with any of these tags"),
+    since: str = Query(None, description="Published on/after (ISO date)"),
+    until: str = Query(None, description="Published on/before (ISO date)"),
+    mode: str = Query(None, description="Retrieval mode: vector or hybrid"),
+    rerank: bool = Query(None, description="Override the configured rerank stage"),
+    recency: float = Query(
+        None, description="Weight (0-1) of freshness vs. relevance in ranking"
+    ),
+    company: str = Query(None, description="Only articles mentioning this company"),
 ):
     """
     Handles GET requests to the /engine endpoint.
     - @app.get("/engine") is a FastAPI decorator
     - This registers engine() as a handler for HTTP GET requests to the endpoint
     - q is a required (...) query parameter that must be a string
+    - category, tags and since/until are applied as filters inside the engine
+    - the engine itself blocks (vector store, LLM), so it runs in a worker thread
+    """
+    async with engine_slot():
+        return await run_in_threadpool(
+            agent.engine,
+            q,
+            category,
+            session_id,
+            tags,
+            since,
+            until,
+            mode,
+            rerank,
+            recency,
+            company,
+        )
+
+
+class BatchRequest(BaseModel):
+    queries: list[str]
+    category: str = None
+    tags: list[str] = None
+    since: str = None
+    until: str = None
+    mode: str = None
+    rerank: bool = None
+    recency: float = None
+    company: str = None
+
+
+@app.get("/engine/stream")
+async def engine_stream(
+    q: str = Query(..., description="Search query"),
+    category: str = None,
+    session_id: str = None,
+    tags: list[str] = Query(None, description="Only articles with any of these tags"),
+    since: str = Query(None, description="Published on/after (ISO date)"),
+    until: str = Query(None, description="Published on/before (ISO date)"),
+    mode: str = Query(None, description="Retrieval mode: vector or hybrid"),
+    rerank: bool = Query(None, description="Override the configured rerank stage"),
+    recency: float = Query(
+        None, description="Weight (0-1) of freshness vs. relevance in ranking"
+    ),
+    company: str = Query(None, description="Only articles mentioning this company"),
+):
+    """
+    Server-Sent Events version of /engine. Sends a "metadata" event with the retrieved results first, then one "token" event per generated text delta, then a "done" event with the full response and stage timings.
     """
-    return agent.engine(q, category, session_id)
+    events = agent.engine_stream(
+        q, category, session_id, tags, since, until, mode, rerank, recency, company
+    )
+
+    async def sse():
+        # A stream holds its slot until the last event, like an /engine request
+        async with engine_slot():
+            async for event, data in events:
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return StreamingResponse(sse(), media_type="text/event-stream")
+
+
+@contextmanager
+def thread_engine_slot(loop):
+    """Holds one of the engine slots from a worker thread, for a batch generation."""
+    asyncio.run_coroutine_threadsafe(take_engine_slot(), loop).result()
+    try:
+        yield
+    finally:
+        loop.call_soon_threadsafe(engine_slots.release)
+
+
+@app.post("/engine/batch")
+async def engine_batch(request: BatchRequest):
+    """
+    Answers many questions in one request. Results are streamed back as NDJSON, one line per query in completion order; each carries its input index.
+    """
+    limit = config.get_section("batch")["max_queries"]
+    if len(request.queries) > limit:
+        raise HTTPException(
+            status_code=422, detail=f"At most {limit} queries per batch"
+        )
+
+    results = agent.engine_batch(
+        request.queries,
+        request.category,
+        request.tags,
+        request.since,
+        request.until,
+        request.mode,
+        request.rerank,
+        request.recency,
+        request.company,
+        slot=functools.partial(thread_engine_slot, asyncio.get_running_loop()),
+    )
+    return StreamingResponse(
+        (json.dumps(result, default=str) + "\n" for result in results),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Returns in-process counters (e.g. cache hits, stage timings) as JSON."""
+    return metrics.snapshot()
+
+
+@app.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """Returns the same counters in the Prometheus text format, for scraping."""
+    return metrics.prometheus()
+
+
+@app.get("/metrics/llm")
+async def get_llm_metrics():
+    """Returns LLM tokens and timings per call site, slowest first."""
+    return llm_metrics.summary()
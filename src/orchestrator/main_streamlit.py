@@ -1,14 +1,20 @@
 import logging
 import streamlit as st
 from app.main.local_LLM import LocalLLM
-from app.main.embedding_search import EmbeddingSearch
+from app.main.search_service import get_search_service
 
 logging.basicConfig(level=logging.INFO)
 
 
+@st.cache_resource
+def load_search_service(database):
+    """One search service per Streamlit process, shared across reruns."""
+    return get_search_service(database)
+
+
 def main():
     LLM = LocalLLM()
-    database = "weaviate"
+    search = load_search_service("weaviate")
 
     # Stores chat history
     if "chat_history" not in st.session_state:
@@ -34,19 +40,19 @@ def main():
         query = st.text_area("Enter your search query:")
         if st.button("Submit"):
             with st.status("Extracting data...", expanded=True) as status:
-                vector_search = EmbeddingSearch(query, database=database)
-                retrieved_data, LLM_context = vector_search.run()
-                logging.info("Generating response...")
-                status.update(label="Querying LLM...", state="running")
-                llm_response = LLM.generate(query, LLM_context)
+                retrieved_data, LLM_context, _ = search.retrieve_context(
+                    query, LLM.context_budget()
+                )
                 status.update(
                     label="Extraction complete!", state="complete", expanded=False
                 )
 
+            # Show the source right away, then stream the answer as it generates
             st.subheader("Response")
             st.write(f"**Title:** {retrieved_data['title']}")
             st.write(f"**Link:** {retrieved_data['link']}")
-            st.write(llm_response)
+            logging.info("Generating response...")
+            llm_response = st.write_stream(LLM.generate_stream(query, LLM_context))
 
             # Store query, response, and context in chat history
             chat_entry = {
@@ -68,19 +74,15 @@ def main():
 
             if st.button("Submit Follow-Up"):
                 logging.info("Generating follow-up response...")
-                with st.status("Querying LLM...", expanded=True) as status:
-                    follow_up_response = LLM.generate(
+                st.subheader("Follow-Up Response")
+                follow_up_response = st.write_stream(
+                    LLM.generate_stream(
                         follow_up_query,
                         context=st.session_state.last_context,
                         prompt_format="follow_up",
                         multi_turn=True,
                     )
-                    status.update(
-                        label="Extraction complete!", state="complete", expanded=False
-                    )
-
-                st.subheader("Follow-Up Response")
-                st.write(follow_up_response)
+                )
 
                 # Store follow-up in chat history
                 prev_resp = st.session_state.chat_history[-1]
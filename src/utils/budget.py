@@ -0,0 +1,45 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.metrics import metrics
+
+
+class BudgetedExecutor:
+    """
+    Runs optional CPU model calls (rerank, extractive QA) in a worker pool so the caller can give up on them. The latency budget starts when a worker picks a call up; time spent waiting for a worker is capped separately by queue_ms, so a loaded server skips the model instead of timing out every call behind the others.
+    """
+
+    def __init__(self, name, workers, budget_ms, queue_ms):
+        self.name = name
+        self.budget_ms = budget_ms
+        self.queue_ms = queue_ms
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def run(self, fn, *args):
+        """
+        Returns fn(*args). Raises TimeoutError("queue") if no worker was free within queue_ms (the call is cancelled), or TimeoutError("budget") if it ran past budget_ms (it still finishes in the background).
+        """
+        started = threading.Event()
+
+        def job():
+            started.set()
+            return fn(*args)
+
+        submitted = time.perf_counter()
+        future = self.executor.submit(job)
+        if not started.wait(self.queue_ms / 1000):
+            if future.cancel():
+                metrics.observe(
+                    f"{self.name}_queue_seconds", time.perf_counter() - submitted
+                )
+                raise TimeoutError("queue")
+            started.wait()  # picked up just as the wait ran out
+        metrics.observe(f"{self.name}_queue_seconds", time.perf_counter() - submitted)
+
+        try:
+            return future.result(timeout=self.budget_ms / 1000)
+        except TimeoutError:
+            raise TimeoutError("budget")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
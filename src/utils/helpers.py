@@ -4,6 +4,7 @@ import hashlib
 import logging
 from bs4 import BeautifulSoup
 from utils.config import config
+from utils.tokens import token_counter
 from urllib.parse import urlparse, urlunparse
 
 
@@ -178,13 +179,8 @@ def import_postgres_data(db_conn, data="all", only_new=False):
     return articles
 
 
-def token_count(text):
+def token_count(text, model=None):
     """
-    Estimates the token count based on word and character length.
-    - Uses whitespace + punctuation-based splitting.
-    - Adjusts for numbers and special characters.
-    - Averages character-based and word-based estimation.
+    Counts tokens with the model's tokenizer (default: tokenizers.default in llmConfig), falling back to a word/character estimate when none is available.
     """
-    words = re.findall(r"\S+", text)  # captures words, punc., special symbols
-    chars = len(text)
-    return int(max(len(words) * 0.8, chars / 4))
\ No newline at end of file
+    return token_counter.count(text, model)
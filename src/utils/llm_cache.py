@@ -0,0 +1,127 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from utils.config import config
+from utils.metrics import metrics
+
+"""
+Disk-backed cache of LLM responses, shared by every process on the machine. Re-running a test script or replaying a pipeline sends identical prompts, which are then answered from SQLite instead of the model.
+"""
+
+TABLE = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+"""
+
+# Options that don't change the response
+IGNORED_OPTIONS = {"keep_alive"}
+
+
+class LLMCache:
+    """
+    SQLite cache of responses keyed by a hash of (backend, model, options, messages), with a TTL and a size cap enforced by evicting the least recently used entries.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings or config.get_section("llm_cache")
+        self.enabled = self.settings["enabled"]
+        self.path = os.path.abspath(os.path.join(config.root, self.settings["path"]))
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")  # readers don't block writers
+            conn.execute(TABLE)
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_used ON llm_cache (used)")
+            conn.commit()
+            self.conn = conn
+        return self.conn
+
+    @staticmethod
+    def make_key(backend, model, messages, options=None):
+        options = {
+            k: v for k, v in (options or {}).items() if k not in IGNORED_OPTIONS
+        }
+        payload = json.dumps(
+            [backend, model, options, messages], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, backend="ollama"):
+        """Returns the cached response, or None on a miss."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self.connect()
+                row = conn.execute(
+                    "SELECT response, created FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] > self.settings["ttl"]:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    row = None
+                elif row:
+                    conn.execute(
+                        "UPDATE llm_cache SET used = ? WHERE key = ?", (now, key)
+                    )
+                    conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache lookup failed: {e}")
+            return None
+
+        if row is None:
+            metrics.incr("llm_cache_misses", backend=backend)
+            return None
+        metrics.incr("llm_cache_hits", backend=backend)
+        return row[0]
+
+    def put(self, key, response, backend="ollama", model=""):
+        """Stores a response, then evicts least recently used entries over the cap."""
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            with self.lock:
+                conn = self.connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, backend, model, response, now, now),
+                )
+                evicted = conn.execute(
+                    """
+                    DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM llm_cache ORDER BY used DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.settings["max_entries"],),
+                ).rowcount
+                conn.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"LLM cache write failed: {e}")
+            return
+        if evicted:
+            metrics.incr("llm_cache_evictions", evicted, backend=backend)
+
+    def clear(self):
+        with self.lock:
+            self.connect().execute("DELETE FROM llm_cache")
+            self.conn.commit()
+
+
+# Create a global instance to be imported anywhere
+llm_cache = LLMCache()
@@ -0,0 +1,156 @@
+import time
+import threading
+from contextlib import contextmanager
+from utils.metrics import metrics
+
+"""
+Instrumentation for every LLM request: tokens, latency, time to first token, queue wait and model load time, labelled by call site (e.g. complete, map_chunks, ExtractionAgent, ScraperAI), backend and model. Totals go to the shared Prometheus-style counters and to a per-call-site JSON summary.
+"""
+
+NS = 1e9  # Ollama reports durations in nanoseconds
+
+
+class LLMCall:
+    """
+    One LLM request being measured. The caller marks when the request is sent (the time before that is queue wait), when the first token arrives and what the backend reported.
+    """
+
+    def __init__(self, site, backend, model):
+        self.site = site
+        self.backend = backend
+        self.model = model
+        self.entered = time.perf_counter()
+        self.sent = None
+        self.first_token = None
+        self.ttft = None  # server-side estimate, if the response wasn't streamed
+        self.load_seconds = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.ok = False
+
+    def send(self):
+        """Marks the request as sent (end of the queue wait)."""
+        if self.sent is None:
+            self.sent = time.perf_counter()
+
+    def token(self):
+        """Marks a streamed delta; the first one sets the time to first token."""
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def usage(self, prompt_tokens, completion_tokens):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    def ollama(self, response):
+        """Reads token counts and timings from an Ollama response (or final stream chunk)."""
+        self.usage(response.get("prompt_eval_count"), response.get("eval_count"))
+        load = response.get("load_duration")
+        if load is not None:
+            self.load_seconds = load / NS
+        prompt_eval = response.get("prompt_eval_duration")
+        if prompt_eval is not None:
+            self.ttft = ((load or 0) + prompt_eval) / NS
+
+    def openai(self, response):
+        """Reads token counts from an OpenAI-style response (OpenAI, Mistral)."""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self.usage(usage.prompt_tokens, usage.completion_tokens)
+
+    def gemini(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.usage(usage.prompt_token_count, usage.candidates_token_count)
+
+
+class LLMMetrics:
+    """
+    Records finished LLM calls in the shared metrics and in per (site, backend, model) totals for the JSON summary.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+
+    @contextmanager
+    def call(self, site, backend, model):
+        """
+        Measures the LLM request made inside the block. It counts as failed if the block raises (a stream closed early by its consumer does not).
+        """
+        record = LLMCall(site, backend, model)
+        try:
+            yield record
+            record.ok = True
+        except GeneratorExit:
+            record.ok = True
+            raise
+        finally:
+            self.record(record)
+
+    def record(self, call):
+        end = time.perf_counter()
+        sent = call.sent or call.entered
+        values = {
+            "seconds": end - call.entered,
+            "queue_seconds": sent - call.entered,
+            "ttft_seconds": (
+                call.first_token - sent if call.first_token is not None else call.ttft
+            ),
+            "load_seconds": call.load_seconds,
+        }
+        tokens = {
+            "prompt_tokens": call.prompt_tokens,
+            "completion_tokens": call.completion_tokens,
+        }
+        labels = {"site": call.site, "backend": call.backend, "model": call.model}
+
+        status = "ok" if call.ok else "error"
+        metrics.incr("llm_calls", status=status, **labels)
+        for name, value in values.items():
+            if value is not None:
+                metrics.observe(f"llm_{name}", value, **labels)
+        for name, value in tokens.items():
+            if value:
+                metrics.incr(f"llm_{name}", value, **labels)
+
+        with self.lock:
+            key = (call.site, call.backend, call.model)
+            total = self.totals.setdefault(key, {"calls": 0, "errors": 0})
+            total["calls"] += 1
+            total["errors"] += 0 if call.ok else 1
+            for name, value in {**values, **tokens}.items():
+                if value is not None:
+                    total[name] = total.get(name, 0) + value
+                    total[f"{name}_n"] = total.get(f"{name}_n", 0) + 1
+
+    def summary(self):
+        """
+        Per call site totals and means, slowest first, with each site's share of all LLM time.
+        """
+        with self.lock:
+            totals = {key: dict(total) for key, total in self.totals.items()}
+        overall = sum(t.get("seconds", 0) for t in totals.values()) or 1.0
+
+        rows = []
+        for (site, backend, model), t in totals.items():
+            row = {
+                "site": site,
+                "backend": backend,
+                "model": model,
+                "calls": t["calls"],
+                "errors": t["errors"],
+                "prompt_tokens": t.get("prompt_tokens", 0),
+                "completion_tokens": t.get("completion_tokens", 0),
+                "total_seconds": round(t.get("seconds", 0), 3),
+                "share": round(t.get("seconds", 0) / overall, 3),
+            }
+            for name in ("seconds", "queue_seconds", "ttft_seconds", "load_seconds"):
+                n = t.get(f"{name}_n")
+                row[f"mean_{name}"] = round(t[name] / n, 3) if n else None
+            rows.append(row)
+        return sorted(rows, key=lambda row: row["total_seconds"], reverse=True)
+
+
+# Create a global instance to be imported anywhere
+llm_metrics = LLMMetrics()
@@ -0,0 +1,79 @@
+import time
+import threading
+from contextlib import contextmanager
+from collections import defaultdict
+
+
+class Metrics:
+    """
+    Thread-safe, in-process counters with optional labels. Keys are rendered Prometheus-style, e.g. retrieval_cache_hits{backend="weaviate"}.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.summaries = set()  # names recorded with observe()
+
+    @staticmethod
+    def key(name, labels):
+        if not labels:
+            return name
+        rendered = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+        return f"{name}{{{rendered}}}"
+
+    def incr(self, name, value=1, **labels):
+        """Increments a counter."""
+        with self.lock:
+            self.counters[self.key(name, labels)] += value
+
+    def observe(self, name, value, **labels):
+        """Records an observation as Prometheus-style _sum and _count counters."""
+        with self.lock:
+            self.summaries.add(name)
+            self.counters[self.key(f"{name}_sum", labels)] += value
+            self.counters[self.key(f"{name}_count", labels)] += 1
+
+    def snapshot(self):
+        """Returns a copy of all counters."""
+        with self.lock:
+            return {"counters": dict(self.counters)}
+
+    def prometheus(self):
+        """Renders all counters in the Prometheus text exposition format."""
+        with self.lock:
+            counters = dict(self.counters)
+            summaries = set(self.summaries)
+
+        families = defaultdict(list)
+        for key, value in sorted(counters.items()):
+            name = key.split("{", 1)[0]
+            base = name.rsplit("_", 1)[0]
+            if name.endswith(("_sum", "_count")) and base in summaries:
+                families[(base, "summary")].append(f"{key} {value}")
+            else:
+                families[(name, "counter")].append(f"{key} {value}")
+
+        lines = []
+        for (name, kind), samples in sorted(families.items()):
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# Create a global instance to be imported anywhere
+metrics = Metrics()
+
+
+@contextmanager
+def stage_timer(stage, timings=None):
+    """
+    Times a pipeline stage (e.g. retrieve, rerank, generate). Records it under stage_seconds and, if given a dict, stores the elapsed milliseconds in it.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("stage_seconds", elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = round(elapsed * 1000, 1)
@@ -0,0 +1,81 @@
+import os
+import logging
+import threading
+import numpy as np
+from utils.config import config
+
+
+class OnnxModel:
+    """
+    A small Hugging Face model exported to ONNX (rerank, extractive QA), run on CPU over batches of (query, passage) pairs. The model file and its tokenizer.json are fetched from the Hub on first use and loaded once; if the download fails the model is marked unavailable, so it isn't retried on every query.
+    """
+
+    def __init__(self, settings, truncation="longest_first"):
+        self.settings = settings
+        self.truncation = truncation  # which side of a pair to cut when too long
+        self.session = None
+        self.tokenizer = None
+        self.unavailable = False
+        self.load_lock = threading.Lock()
+
+    def files(self):
+        """
+        Returns local paths to the ONNX model and its tokenizer, fetching them from the Hugging Face Hub on first use.
+        """
+        model_dir = os.path.join(config.root, self.settings["model_dir"])
+        model_path = os.path.join(model_dir, self.settings["onnx_file"])
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        if not (os.path.exists(model_path) and os.path.exists(tokenizer_path)):
+            from huggingface_hub import hf_hub_download
+
+            for filename in (self.settings["onnx_file"], "tokenizer.json"):
+                hf_hub_download(self.settings["model"], filename, local_dir=model_dir)
+        return model_path, tokenizer_path
+
+    def load(self):
+        """Loads the ONNX session and tokenizer once."""
+        with self.load_lock:
+            if self.session is not None:
+                return
+            import onnxruntime
+            from tokenizers import Tokenizer
+
+            try:
+                model_path, tokenizer_path = self.files()
+            except Exception:
+                # Don't retry the download on every query
+                self.unavailable = True
+                raise
+            tokenizer = Tokenizer.from_file(tokenizer_path)
+            tokenizer.enable_truncation(
+                max_length=self.settings["max_length"], strategy=self.truncation
+            )
+            tokenizer.enable_padding()
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.settings["threads"]
+            self.session = onnxruntime.InferenceSession(
+                model_path, options, providers=["CPUExecutionProvider"]
+            )
+            self.input_names = {i.name for i in self.session.get_inputs()}
+            self.tokenizer = tokenizer
+            logging.info(f"Loaded ONNX model {self.settings['model']}.")
+
+    def run(self, query, passages):
+        """
+        Encodes every (query, passage) pair and runs them in one batched forward pass. Returns the encodings (for token offsets) and the model outputs.
+        """
+        self.load()
+        encodings = self.tokenizer.encode_batch([(query, p) for p in passages])
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encodings], dtype=np.int64
+            ),
+            "token_type_ids": np.array(
+                [e.type_ids for e in encodings], dtype=np.int64
+            ),
+        }
+        # Some exports take no token_type_ids
+        inputs = {k: v for k, v in inputs.items() if k in self.input_names}
+        return encodings, self.session.run(None, inputs)
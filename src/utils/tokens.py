@@ -0,0 +1,123 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from utils.config import ConfigLoader
+from utils.metrics import metrics
+
+
+def estimate_tokens(text):
+    """
+    Estimates the token count based on word and character length.
+    - Uses whitespace + punctuation-based splitting.
+    - Adjusts for numbers and special characters.
+    - Averages character-based and word-based estimation.
+    """
+    words = re.findall(r"\S+", text)  # captures words, punc., special symbols
+    chars = len(text)
+    return int(max(len(words) * 0.8, chars / 4))
+
+
+class TokenCounter:
+    """
+    Counts tokens with each model's real tokenizer (a Hugging Face tokenizer.json, loaded once per model). Counts are memoized by (model, text hash) in an LRU, and models without a tokenizer fall back to estimate_tokens.
+    """
+
+    def __init__(self, settings=None):
+        cfg = ConfigLoader("llmConfig")
+        self.root = cfg.root
+        self.settings = settings or cfg.get_section("tokenizers")
+        self.tokenizers = {}  # model -> Tokenizer, or None if unavailable
+        self.load_lock = threading.Lock()
+
+        self.counts = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+    def tokenizer(self, model=None):
+        """Returns the tokenizer for a model (a key of llmConfig models)."""
+        model = model or self.settings["default"]
+        if model not in self.tokenizers:
+            with self.load_lock:
+                if model not in self.tokenizers:
+                    self.tokenizers[model] = self.load(model)
+        return self.tokenizers[model]
+
+    def load(self, model):
+        """
+        Loads a model's tokenizer.json, fetching it from the Hugging Face Hub on first use. Returns None (and is not retried) if that fails.
+        """
+        repo = self.settings["models"].get(model)
+        if not repo:
+            return None
+        try:
+            from tokenizers import Tokenizer
+
+            model_dir = os.path.join(self.root, self.settings["model_dir"], repo)
+            path = os.path.join(model_dir, "tokenizer.json")
+            if not os.path.exists(path):
+                from huggingface_hub import hf_hub_download
+
+                hf_hub_download(repo, "tokenizer.json", local_dir=model_dir)
+            tokenizer = Tokenizer.from_file(path)
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+        except Exception as e:
+            logging.warning(f"No tokenizer for {model}; estimating tokens: {e}")
+            return None
+        logging.info(f"Loaded {repo} tokenizer for {model}.")
+        return tokenizer
+
+    def warm_up(self):
+        """
+        Loads (and if needed downloads) every configured tokenizer; called at startup, so the first query doesn't wait on the Hub while holding the load lock.
+        """
+        for model in self.settings["models"]:
+            self.tokenizer(model)
+
+    def count_many(self, texts, model=None):
+        """Counts tokens for a list of texts, encoding uncached ones in one batch."""
+        model = model or self.settings["default"]
+        tokenizer = self.tokenizer(model)
+        if tokenizer is None:
+            return [estimate_tokens(text) for text in texts]
+
+        keys = [(model, hashlib.md5(t.encode("utf-8")).hexdigest()) for t in texts]
+        with self.cache_lock:
+            found = {key: self.counts[key] for key in keys if key in self.counts}
+            for key in found:
+                self.counts.move_to_end(key)
+        metrics.incr("token_cache_hits", len(found))
+
+        # Duplicate texts in one call are only encoded once
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            metrics.incr("token_cache_misses", len(missing))
+            encodings = tokenizer.encode_batch(
+                list(missing.values()), add_special_tokens=False
+            )
+            with self.cache_lock:
+                for key, encoding in zip(missing, encodings):
+                    found[key] = self.counts[key] = len(encoding.ids)
+                while len(self.counts) > self.settings["cache_entries"]:
+                    self.counts.popitem(last=False)
+
+        return [found[key] for key in keys]
+
+    def count(self, text, model=None):
+        return self.count_many([text], model)[0]
+
+    def truncate(self, text, max_tokens, model=None):
+        """Cuts text down to its first max_tokens tokens."""
+        tokenizer = self.tokenizer(model)
+        if tokenizer is None:
+            return text[: max_tokens * 4]  # 1 token ~ 4 characters
+        encoding = tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        return text[: encoding.offsets[max_tokens - 1][1]]
+
+
+# Create a global instance to be imported anywhere
+token_counter = TokenCounter()
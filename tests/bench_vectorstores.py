@@ -0,0 +1,145 @@
+import sys
+import time
+import logging
+import numpy as np
+from utils.config import config
+from app.main.vector_store import ChromaStore, InMemoryStore, WeaviateStore
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format="%(levelname)s - %(message)s",
+)
+
+"""
+Benchmarks each VectorStore backend on a synthetic corpus:
+ - ingest throughput (docs/s) through batched upsert,
+ - p50/p99 single-query latency,
+ - recall@k against an exact brute-force baseline.
+
+Usage: python tests/bench_vectorstores.py [memory chroma weaviate]
+"""
+
+N_DOCS = 5000
+N_QUERIES = 200
+DIM = 384  # all-MiniLM-L6-v2
+K = 10
+BATCH_SIZE = 200
+BENCH_COLLECTION = "BenchVectors"
+
+
+def synthetic_corpus(n_docs, n_queries, dim, seed=0):
+    """Clustered unit vectors, so neighbours are not all equidistant."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(64, dim))
+    docs = centers[rng.integers(0, 64, n_docs)] + 0.5 * rng.normal(size=(n_docs, dim))
+    queries = centers[rng.integers(0, 64, n_queries)] + 0.5 * rng.normal(
+        size=(n_queries, dim)
+    )
+    docs /= np.linalg.norm(docs, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    records = [
+        {"hash": f"doc-{i}", "title": f"Doc {i}", "content": f"doc {i}", "vector": v}
+        for i, v in enumerate(docs.astype(np.float32).tolist())
+    ]
+    return records, docs, queries
+
+
+def brute_force(docs, queries, k):
+    """Exact top-k ids by cosine similarity."""
+    scores = queries @ docs.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [{f"doc-{i}" for i in row} for row in top]
+
+
+def make_store(name):
+    """Creates an empty store for the benchmark (never the live collections)."""
+    if name == "memory":
+        return InMemoryStore(fields=["hash", "title", "content"])
+
+    if name == "chroma":
+        import chromadb
+
+        cfg = {"data": ["hash", "title", "content"], "metadata": ["title"]}
+        return ChromaStore(
+            cfg=cfg,
+            client=chromadb.EphemeralClient(),
+            collection=BENCH_COLLECTION.lower(),
+            space="cosine",
+        )
+
+    if name == "weaviate":
+        import weaviate
+        import weaviate.classes as wvc
+
+        cfg = dict(config.get_section("weaviate"), fields=["hash", "title", "content"])
+        client = weaviate.connect_to_local(port=cfg["port"])
+        client.collections.delete(BENCH_COLLECTION)
+        client.collections.create(
+            name=BENCH_COLLECTION,
+            vectorizer_config=wvc.config.Configure.Vectorizer.none(),
+            vector_index_config=wvc.config.Configure.VectorIndex.hnsw(
+                distance_metric=wvc.config.VectorDistances.COSINE
+            ),
+            properties=[
+                wvc.config.Property(name=f, data_type=wvc.config.DataType.TEXT)
+                for f in cfg["fields"]
+            ],
+        )
+        return WeaviateStore(cfg=cfg, collection=BENCH_COLLECTION, client=client)
+
+    raise KeyError(f"Unknown store: {name}")
+
+
+def cleanup(store):
+    if store.name == "weaviate":
+        store.client.collections.delete(BENCH_COLLECTION)
+    store.close()
+
+
+def bench(store, records, queries, truth, k):
+    # Ingest throughput
+    start = time.perf_counter()
+    store.upsert(records, batch_size=BATCH_SIZE)
+    ingest_s = time.perf_counter() - start
+
+    # Warm-up query (index build, connection setup)
+    store.query(vectors=[queries[0].tolist()], k=k)
+
+    # Single-query latency and recall
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        hits = store.query(vectors=[query.tolist()], k=k)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len({hit.id for hit in hits} & expected) / k)
+
+    return {
+        "docs/s": len(records) / ingest_s,
+        "p50 ms": float(np.percentile(latencies, 50)),
+        "p99 ms": float(np.percentile(latencies, 99)),
+        f"recall@{k}": float(np.mean(recalls)),
+    }
+
+
+if __name__ == "__main__":
+    backends = sys.argv[1:] or ["memory", "chroma", "weaviate"]
+    records, docs, queries = synthetic_corpus(N_DOCS, N_QUERIES, DIM)
+    truth = brute_force(docs, queries, K)
+
+    print(f"{N_DOCS} docs, {N_QUERIES} queries, dim={DIM}, k={K}\n")
+    print(f"{'backend':<10}{'docs/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'recall':>10}")
+    for name in backends:
+        try:
+            store = make_store(name)
+        except Exception as e:
+            print(f"{name:<10}unavailable: {e}")
+            continue
+        try:
+            r = bench(store, records, queries, truth, K)
+            print(
+                f"{name:<10}{r['docs/s']:>12.0f}{r['p50 ms']:>10.2f}"
+                f"{r['p99 ms']:>10.2f}{r[f'recall@{K}']:>10.3f}"
+            )
+        finally:
+            cleanup(store)
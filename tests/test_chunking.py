@@ -20,7 +20,8 @@ print(f"Query:\n{test_query}\n\n")
 no_chunking = llm.generate(test_query, test_article)
 print(f"Without chunking:\n{no_chunking}\n\n")
 
-custom_chunking = {"size": 2000, "overlap": 20, "limit": 1000}
+# Sizes are in tokens: 500-token chunks, well under the 1000-token prompt limit
+custom_chunking = {"size": 500, "overlap": 20, "limit": 1000}
 llm = LocalLLM(model=model, custom_chunking=custom_chunking)
 chunking = llm.generate(test_query, test_article)
 print(f"With chunking:\n{chunking}")
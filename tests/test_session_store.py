@@ -0,0 +1,106 @@
+import time
+import pytest
+from app.main.session_store import (
+    InMemorySessionStore,
+    SQLiteSessionStore,
+    RedisSessionStore,
+)
+
+
+def settings(tmp_path, **overrides):
+    return {
+        "backend": "memory",
+        "ttl": 3600,
+        "max_bytes": 1 << 20,
+        "max_sessions": 100,
+        "path": str(tmp_path / "sessions.sqlite"),
+        "redis_url": "redis://localhost:6379/0",
+        "prefix": "test",
+        **overrides,
+    }
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = InMemorySessionStore(settings(tmp_path))
+    elif request.param == "sqlite":
+        store = SQLiteSessionStore(settings(tmp_path))
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        store = RedisSessionStore(settings(tmp_path), client=fakeredis.FakeRedis())
+    yield store
+    store.close()
+
+
+def turns(*queries):
+    return {"summary": "", "turns": [{"query": q, "response": "r"} for q in queries]}
+
+
+def test_follow_up_save_keeps_session_and_article(store):
+    store.save("s1", turns("q1"), "h1", "article text")
+    # Follow-ups only pass the hash; the article is already stored
+    store.save("s1", turns("q1", "q2"), "h1")
+
+    session = store.load("s1")
+    assert session["conversation"] == turns("q1", "q2")
+    assert session["article_hash"] == "h1"
+    assert store.article("h1") == "article text"
+
+
+def test_sessions_share_an_article(store):
+    store.save("s1", turns("q1"), "h1", "article text")
+    store.save("s2", turns("q2"), "h1")
+    store.delete("s1")
+
+    assert store.load("s1") is None
+    assert store.load("s2")["article_hash"] == "h1"
+    assert store.article("h1") == "article text"
+
+
+def test_unknown_session(store):
+    assert store.load("missing") is None
+
+
+def test_memory_byte_budget_counts_articles_once(tmp_path):
+    store = InMemorySessionStore(settings(tmp_path, max_bytes=3000))
+    for i in range(5):
+        store.save(f"s{i}", turns("q"), "h1", "x" * 1000)
+    assert len(store.sessions) == 5 and len(store.articles) == 1
+
+    # A large new article pushes the older sessions (and their article) out
+    store.save("big", turns("q"), "h2", "y" * 2500)
+    assert list(store.sessions) == ["big"]
+    assert store.article("h1") is None
+    assert store.bytes <= 3000
+
+
+def test_memory_expiry_drops_article(tmp_path):
+    store = InMemorySessionStore(settings(tmp_path, ttl=0.01))
+    store.save("s1", turns("q"), "h1", "article text")
+    time.sleep(0.02)
+    assert store.load("s1") is None
+    assert store.article("h1") is None and store.bytes == 0
+
+
+def test_sqlite_expiry_and_delete_remove_orphaned_articles(tmp_path):
+    store = SQLiteSessionStore(settings(tmp_path, ttl=0.01))
+    store.save("s1", turns("q"), "h1", "article text")
+    time.sleep(0.02)
+    assert store.load("s1") is None
+    assert store.article("h1") is None
+
+    store.ttl = 3600
+    store.save("s2", turns("q"), "h2", "other text")
+    store.delete("s2")
+    assert store.article("h2") is None
+    store.close()
+
+
+def test_sqlite_keeps_at_most_max_sessions(tmp_path):
+    store = SQLiteSessionStore(settings(tmp_path, max_sessions=2))
+    for i in range(3):
+        store.save(f"s{i}", turns("q"), f"h{i}", f"a{i}")
+    assert store.load("s0") is None and store.article("h0") is None
+    assert store.load("s2")["article_hash"] == "h2"
+    store.close()